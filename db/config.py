@@ -50,8 +50,20 @@ if USE_DEV_DB:
 # Detect if we're using Supabase (requires SSL/TLS)
 is_supabase = 'supabase.co' in DATABASE_URL or 'pooler.supabase.com' in DATABASE_URL
 
+# Connection pool settings shared by the admin and read-only engines. The UI runs
+# queries from a threadpool (UI_THREADPOOL_SIZE), so the pool should cover that
+# concurrency; pre-ping drops connections the server or pooler closed while idle.
+# Pools are per process: with `uvicorn --workers N` the server sees up to
+# N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+POOL_KWARGS = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+    'pool_pre_ping': True,
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '3600')),
+}
+
 # Create admin engine (for setup_db.py and migrations)
-admin_engine_kwargs = {'echo': False}
+admin_engine_kwargs = {'echo': False, **POOL_KWARGS}
 if is_supabase:
     # Supabase requires SSL connections in production
     admin_engine_kwargs['connect_args'] = {'sslmode': 'require'}
@@ -61,7 +73,7 @@ engine = create_engine(DATABASE_URL, **admin_engine_kwargs)  # Admin engine
 # Create read-only engine for application queries (if APP_DATABASE_URL is set)
 readonly_engine = None
 if APP_DATABASE_URL:
-    readonly_kwargs = {'echo': False}
+    readonly_kwargs = {'echo': False, **POOL_KWARGS}
     is_supabase_readonly = 'supabase.co' in APP_DATABASE_URL or 'pooler.supabase.com' in APP_DATABASE_URL
     if is_supabase_readonly:
         readonly_kwargs['connect_args'] = {'sslmode': 'require'}
@@ -92,6 +104,8 @@ else:
 
 # Default session uses read-only engine (safer for application use)
 SessionLocal = ReadOnlySessionLocal
+# Engine behind SessionLocal, for Core queries that don't need a Session
+app_engine = readonly_engine or engine
 
 
 def get_session():
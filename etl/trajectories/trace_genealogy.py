@@ -9,7 +9,10 @@ back through committee reports, drafts, meeting records, and agenda items.
 import argparse
 import html
 import json
+import os
+import pickle
 import re
+import sys
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
@@ -22,6 +25,19 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent
 DEFAULT_DATA_ROOT = PROJECT_ROOT / "data"
 DEFAULT_PARSED_HTML = DEFAULT_DATA_ROOT / "parsed" / "html"
 DEFAULT_PARSED_PDFS = DEFAULT_DATA_ROOT / "parsed" / "pdfs"
+DEFAULT_PDF_DOCUMENTS = DEFAULT_DATA_ROOT / "documents" / "pdfs"
+
+# On-disk index cache (written inside data_root)
+INDEX_CACHE_NAME = ".genealogy_index.pkl"
+INDEX_CACHE_VERSION = 2
+
+# Document type directory name -> trace tree list it is reported under
+DOC_TYPE_TREE_KEYS = {
+    "resolutions": "resolutions",
+    "drafts": "drafts",
+    "committee-reports": "committee_reports",
+    "meetings": "meetings",
+}
 
 
 @dataclass
@@ -35,13 +51,94 @@ class DocumentReference:
 class UNDocumentIndex:
     """Index of all UN documents for fast lookup by symbol."""
 
-    def __init__(self, data_root: Path = DEFAULT_PARSED_HTML):
+    def __init__(self, data_root: Path = DEFAULT_PARSED_HTML, use_cache: bool = True):
         self.data_root = Path(data_root)
+        self.use_cache = use_cache
+        self.cache_path = self.data_root / INDEX_CACHE_NAME
         self.documents: Dict[str, Path] = {}
+        # Normalized symbol -> containing document type directory (e.g. "resolutions")
+        self.doc_types: Dict[str, str] = {}
         self._build_index()
 
+    def _source_roots(self) -> List[Path]:
+        """Directories whose JSON files feed the index."""
+        return [self.data_root, DEFAULT_PARSED_PDFS, DEFAULT_PDF_DOCUMENTS]
+
+    def _source_signature(self) -> Tuple[str, float, int]:
+        """Return (cwd, max mtime, file count) over all indexed JSON files and subdirectories.
+
+        The root directories themselves are skipped so that writing the cache
+        file into data_root does not invalidate it. Indexed paths are relative
+        when data_root is, so the working directory is part of the signature.
+        """
+        latest = 0.0
+        count = 0
+        stack = [str(root) for root in self._source_roots() if root.is_dir()]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            latest = max(latest, entry.stat().st_mtime)
+                            stack.append(entry.path)
+                        elif entry.name.endswith(".json"):
+                            latest = max(latest, entry.stat().st_mtime)
+                            count += 1
+            except OSError:
+                continue
+        base = "" if self.data_root.is_absolute() else os.getcwd()
+        return base, latest, count
+
+    def _load_cache(self, signature: Tuple[str, float, int]) -> bool:
+        """Populate the index from the on-disk cache if it is still fresh."""
+        try:
+            with open(self.cache_path, "rb") as f:
+                cached = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable index cache {self.cache_path}: {e}")
+            return False
+
+        if cached.get("version") != INDEX_CACHE_VERSION or cached.get("signature") != signature:
+            return False
+
+        # Unpickled strings are fresh copies; intern the cached keys so both maps share them
+        self.documents = {sys.intern(symbol): path for symbol, path in cached["documents"].items()}
+        self.doc_types = {sys.intern(symbol): doc_type for symbol, doc_type in cached["doc_types"].items()}
+        return True
+
+    def _save_cache(self, signature: Tuple[str, float, int]):
+        """Persist the index so later invocations can skip re-parsing every JSON."""
+        payload = {
+            "version": INDEX_CACHE_VERSION,
+            "signature": signature,
+            "documents": self.documents,
+            "doc_types": self.doc_types,
+        }
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(payload, f, protocol=5)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: Failed to write index cache {self.cache_path}: {e}")
+
     def _build_index(self):
-        """Build index of all documents by symbol."""
+        """Build index of all documents by symbol, reusing the on-disk cache when fresh."""
+        if not self.use_cache:
+            self._scan_documents()
+            return
+
+        signature = self._source_signature()
+        if self._load_cache(signature):
+            return
+
+        self._scan_documents()
+        self._save_cache(signature)
+
+    def _scan_documents(self):
+        """Scan parsed JSON files and index them by normalized symbol."""
         # Index HTML parsed documents
         for doc_type_dir in self.data_root.iterdir():
             if not doc_type_dir.is_dir():
@@ -56,13 +153,14 @@ class UNDocumentIndex:
                             # Normalize symbol (remove spaces, etc.)
                             normalized = self._normalize_symbol(symbol)
                             self.documents[normalized] = json_file
+                            self.doc_types[normalized] = doc_type_dir.name
                 except Exception as e:
                     print(f"Warning: Failed to index {json_file}: {e}")
 
         # Also index PDF parsed documents
         pdf_dirs = [
             DEFAULT_PARSED_PDFS,
-            DEFAULT_DATA_ROOT / "documents" / "pdfs"
+            DEFAULT_PDF_DOCUMENTS
         ]
         
         for pdf_root in pdf_dirs:
@@ -90,6 +188,11 @@ class UNDocumentIndex:
                             # Prefer files with "parsed" in name or from parsed directory
                             if normalized not in self.documents or json_file.name.endswith("_parsed.json"):
                                 self.documents[normalized] = json_file
+                                relative_parts = json_file.relative_to(pdf_root).parts
+                                if len(relative_parts) > 1:
+                                    self.doc_types[normalized] = relative_parts[0]
+                                else:
+                                    self.doc_types.pop(normalized, None)
                 except Exception as e:
                     # print(f"Warning: Failed to index {json_file}: {e}")
                     pass
@@ -123,8 +226,12 @@ class DocumentGenealogy:
     def __init__(self, index: UNDocumentIndex):
         self.index = index
 
-    def trace_backwards(self, resolution_symbol: str) -> Dict[str, Any]:
-        """Trace genealogy backwards from resolution to origins."""
+    def trace_backwards(self, resolution_symbol: str, load_data: bool = True) -> Dict[str, Any]:
+        """Trace genealogy backwards from resolution to origins.
+
+        With load_data=False, related entries carry "data": None instead of
+        their parsed JSON (the root document is always loaded).
+        """
         resolution = self.index.load(resolution_symbol)
         if not resolution:
             return {"error": f"Resolution {resolution_symbol} not found"}
@@ -145,7 +252,7 @@ class DocumentGenealogy:
             draft_symbol = draft_ref.get("text")
             tree["drafts"].append({
                 "symbol": draft_symbol,
-                "data": self.index.load(draft_symbol),
+                "data": self.index.load(draft_symbol) if load_data else None,
                 "found": self.index.find(draft_symbol) is not None
             })
 
@@ -153,7 +260,7 @@ class DocumentGenealogy:
             report_symbol = report_ref.get("text")
             tree["committee_reports"].append({
                 "symbol": report_symbol,
-                "data": self.index.load(report_symbol),
+                "data": self.index.load(report_symbol) if load_data else None,
                 "found": self.index.find(report_symbol) is not None
             })
 
@@ -161,7 +268,7 @@ class DocumentGenealogy:
             meeting_symbol = meeting_ref.get("text")
             tree["meeting_records"].append({
                 "symbol": meeting_symbol,
-                "data": self.index.load(meeting_symbol),
+                "data": self.index.load(meeting_symbol) if load_data else None,
                 "found": self.index.find(meeting_symbol) is not None
             })
 
@@ -172,19 +279,19 @@ class DocumentGenealogy:
                 "item_number": agenda_item.get("item_number"),
                 "sub_item": agenda_item.get("sub_item"),
                 "title": agenda_item.get("title"),
-                "data": self.index.load(agenda_symbol),
+                "data": self.index.load(agenda_symbol) if load_data else None,
                 "found": self.index.find(agenda_symbol) is not None
             })
 
         # Trace committee deliberations
         tree["committee_deliberations"] = []
         for report in tree["committee_reports"]:
-            srs = self.find_committee_deliberations(report["symbol"])
+            srs = self.find_committee_deliberations(report["symbol"], load_data=load_data)
             tree["committee_deliberations"].extend(srs)
 
         return tree
 
-    def find_committee_deliberations(self, report_symbol: str) -> List[Dict[str, Any]]:
+    def find_committee_deliberations(self, report_symbol: str, load_data: bool = True) -> List[Dict[str, Any]]:
         """Find committee summary records referenced in a committee report."""
         report_data = self.index.load(report_symbol)
         
@@ -221,14 +328,19 @@ class DocumentGenealogy:
             
             srs.append({
                 "symbol": symbol,
-                "data": self.index.load(symbol),
+                "data": self.index.load(symbol) if load_data else None,
                 "found": self.index.find(symbol) is not None
             })
             
         return srs
 
-    def trace_forwards(self, agenda_symbol: str, item_number: str = None) -> Dict[str, Any]:
-        """Trace forwards from agenda item to all resulting documents."""
+    def trace_forwards(self, agenda_symbol: str, item_number: str = None,
+                       load_data: bool = True) -> Dict[str, Any]:
+        """Trace forwards from agenda item to all resulting documents.
+
+        With load_data=False, matching documents are kept as symbol-only
+        entries so the scanned JSON can be freed as the search proceeds.
+        """
         agenda = self.index.load(agenda_symbol)
         if not agenda:
             return {"error": f"Agenda {agenda_symbol} not found"}
@@ -244,7 +356,7 @@ class DocumentGenealogy:
         }
 
         # Search all documents for ones that reference this agenda item
-        for doc_symbol, doc_path in self.index.documents.items():
+        for doc_symbol in self.index.documents:
             doc_data = self.index.load(doc_symbol)
             if not doc_data:
                 continue
@@ -260,23 +372,22 @@ class DocumentGenealogy:
                         if ref_item != item_number:
                             continue
 
-                    # Categorize by document type (from path)
-                    doc_entry = {"symbol": doc_symbol, "data": doc_data, "found": True}
-
-                    if "/resolutions/" in str(doc_path):
-                        tree["resolutions"].append(doc_entry)
-                    elif "/drafts/" in str(doc_path):
-                        tree["drafts"].append(doc_entry)
-                    elif "/committee-reports/" in str(doc_path):
-                        tree["committee_reports"].append(doc_entry)
-                    elif "/meetings/" in str(doc_path):
-                        tree["meetings"].append(doc_entry)
+                    # Categorize by document type (from its index directory)
+                    doc_entry = {"symbol": doc_symbol, "data": doc_data if load_data else None, "found": True}
+
+                    tree_key = DOC_TYPE_TREE_KEYS.get(self.index.doc_types.get(doc_symbol))
+                    if tree_key:
+                        tree[tree_key].append(doc_entry)
                     break
 
         return tree
 
-    def trace_from_draft(self, draft_symbol: str) -> Dict[str, Any]:
-        """Trace both directions from a draft resolution."""
+    def trace_from_draft(self, draft_symbol: str, load_data: bool = True) -> Dict[str, Any]:
+        """Trace both directions from a draft resolution.
+
+        With load_data=False, related entries carry "data": None instead of
+        their parsed JSON (the draft itself is always loaded).
+        """
         draft = self.index.load(draft_symbol)
         if not draft:
             return {"error": f"Draft {draft_symbol} not found"}
@@ -290,32 +401,38 @@ class DocumentGenealogy:
             "agenda_items": []
         }
 
+        # Documents already parsed during this trace, keyed by normalized symbol,
+        # so the forwards scan does not open the same JSON file a second time
+        loaded: Dict[str, Dict[str, Any]] = {self.index._normalize_symbol(draft_symbol): draft}
+
         # Get agenda items (backwards)
         for agenda_item in draft.get("agenda", []):
             agenda_symbol = agenda_item.get("agenda_symbol")
+            agenda_data = self.index.load(agenda_symbol) if load_data else None
+            if agenda_data:
+                loaded[self.index._normalize_symbol(agenda_symbol)] = agenda_data
             tree["agenda_items"].append({
                 "symbol": agenda_symbol,
                 "item_number": agenda_item.get("item_number"),
                 "sub_item": agenda_item.get("sub_item"),
-                "data": self.index.load(agenda_symbol),
+                "data": agenda_data,
                 "found": self.index.find(agenda_symbol) is not None
             })
 
         # Find documents that reference this draft (forwards)
-        for doc_symbol, doc_path in self.index.documents.items():
-            doc_data = self.index.load(doc_symbol)
+        for doc_symbol in self.index.documents:
+            doc_data = loaded.get(doc_symbol) or self.index.load(doc_symbol)
             if not doc_data:
                 continue
 
             # Check if this doc references our draft
             for draft_ref in doc_data.get("related_documents", {}).get("drafts", []):
                 if draft_ref.get("text") == draft_symbol:
-                    doc_entry = {"symbol": doc_symbol, "data": doc_data, "found": True}
+                    doc_entry = {"symbol": doc_symbol, "data": doc_data if load_data else None, "found": True}
 
-                    if "/resolutions/" in str(doc_path):
-                        tree["resolutions"].append(doc_entry)
-                    elif "/committee-reports/" in str(doc_path):
-                        tree["committee_reports"].append(doc_entry)
+                    tree_key = DOC_TYPE_TREE_KEYS.get(self.index.doc_types.get(doc_symbol))
+                    if tree_key in ("resolutions", "committee_reports"):
+                        tree[tree_key].append(doc_entry)
                     break
 
         return tree
@@ -896,6 +1013,11 @@ def main():
         type=Path,
         help="Root directory for parsed HTML data"
     )
+    parser.add_argument(
+        "--no-index-cache",
+        action="store_true",
+        help=f"Rescan all documents without reading or writing the index cache ({INDEX_CACHE_NAME})"
+    )
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -926,29 +1048,33 @@ def main():
 
     # Build index
     print(f"Building document index from {args.data_root}...")
-    index = UNDocumentIndex(args.data_root)
+    index = UNDocumentIndex(args.data_root, use_cache=not args.no_index_cache)
     print(f"Indexed {len(index.documents)} documents")
 
     # Auto-detect mode if not specified
     mode = args.mode
     if not mode:
-        if "/RES/" in args.symbol.upper():
+        symbol_upper = args.symbol.upper()
+        if "/RES/" in symbol_upper:
             mode = "backwards"
-        elif "/L." in args.symbol.upper():
+        elif "/L." in symbol_upper:
             mode = "draft"
         else:
             mode = "forwards"
 
+    graph_requested = any([args.graph_json, args.graph_mermaid, args.graph_html])
+    # Related documents' contents are only needed for JSON output and graph titles
+    load_data = args.json or graph_requested
+
     # Trace genealogy
     genealogy = DocumentGenealogy(index)
     if mode == "backwards":
-        tree = genealogy.trace_backwards(args.symbol)
+        tree = genealogy.trace_backwards(args.symbol, load_data=load_data)
     elif mode == "forwards":
-        tree = genealogy.trace_forwards(args.symbol, args.item)
+        tree = genealogy.trace_forwards(args.symbol, args.item, load_data=load_data)
     elif mode == "draft":
-        tree = genealogy.trace_from_draft(args.symbol)
+        tree = genealogy.trace_from_draft(args.symbol, load_data=load_data)
 
-    graph_requested = any([args.graph_json, args.graph_mermaid, args.graph_html])
     graph_data = None
     if graph_requested and "error" not in tree:
         try:
@@ -964,7 +1090,9 @@ def main():
     should_print_tree = not args.json and (not graph_to_stdout or "error" in tree)
 
     if args.json:
-        print(json.dumps(tree, indent=2, default=str))
+        # json.dump encodes incrementally, so large trees are never held as one string
+        json.dump(tree, sys.stdout, indent=2, default=str)
+        sys.stdout.write("\n")
     elif should_print_tree:
         genealogy.print_tree(tree, verbose=args.verbose)
 
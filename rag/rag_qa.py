@@ -43,9 +43,12 @@ def get_value(cell_data: Any) -> Any:
     """Extract value from either UI-formatted or raw cell data."""
     if cell_data is None:
         return None
-    # UI-formatted: {"full": "value", "display": "...", "truncated": False}
+    # UI-formatted: {"display": "...", "truncated": True, "full": "value"}; cells that
+    # weren't truncated carry no "full" since it would equal "display"
     if isinstance(cell_data, dict) and "full" in cell_data:
         return cell_data["full"]
+    if isinstance(cell_data, dict) and "display" in cell_data and "truncated" in cell_data:
+        return cell_data["display"]
     # Raw string/value
     return cell_data
 
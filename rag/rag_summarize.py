@@ -45,7 +45,8 @@ def extract_text_fields(query_results: Dict[str, Any]) -> List[str]:
     4. 'title' column as final fallback
 
     Handles both:
-    - UI-formatted results: {"full": "value", "display": "...", "truncated": False}
+    - UI-formatted results: {"display": "...", "truncated": True, "full": "value"};
+      untruncated cells have no "full" and "display" holds the whole value
     - Raw database results: direct string/dict values
 
     Args:
@@ -65,9 +66,12 @@ def extract_text_fields(query_results: Dict[str, Any]) -> List[str]:
         """Extract string value from either UI-formatted or raw cell data."""
         if cell_data is None:
             return None
-        # UI-formatted: {"full": "value", "display": "...", "truncated": False}
+        # UI-formatted: {"display": "...", "truncated": True, "full": "value"}; cells that
+        # weren't truncated carry no "full" since it would equal "display"
         if isinstance(cell_data, dict) and "full" in cell_data:
             return cell_data["full"]
+        if isinstance(cell_data, dict) and "display" in cell_data and "truncated" in cell_data:
+            return cell_data["display"]
         # Raw string/value
         return cell_data
 
@@ -0,0 +1,111 @@
+"""Tests for the genealogy document index."""
+
+import json
+
+import pytest
+
+from etl.trajectories import trace_genealogy
+from etl.trajectories.trace_genealogy import DocumentGenealogy, UNDocumentIndex, INDEX_CACHE_NAME
+
+
+def _write_doc(path, symbol, **extra):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"metadata": {"symbol": symbol, "title": symbol}, **extra}))
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    """Parsed HTML tree with PDF roots redirected away from the real data/ directory."""
+    monkeypatch.setattr(trace_genealogy, "DEFAULT_PARSED_PDFS", tmp_path / "pdfs")
+    monkeypatch.setattr(trace_genealogy, "DEFAULT_PDF_DOCUMENTS", tmp_path / "documents")
+
+    root = tmp_path / "html"
+    _write_doc(root / "resolutions" / "A_RES_78_1.json", "A/RES/78/1")
+    _write_doc(root / "agenda" / "A_78_251.json", "A/78/251")
+    return root
+
+
+def test_index_writes_and_reuses_cache(data_root, monkeypatch):
+    index = UNDocumentIndex(data_root)
+    assert set(index.documents) == {"A/RES/78/1", "A/78/251"}
+    assert (data_root / INDEX_CACHE_NAME).exists()
+
+    # A warm run must not rescan the JSON files
+    def fail_scan(self):
+        raise AssertionError("index was rebuilt despite a fresh cache")
+
+    monkeypatch.setattr(UNDocumentIndex, "_scan_documents", fail_scan)
+    cached = UNDocumentIndex(data_root)
+    assert cached.documents == index.documents
+
+
+def test_index_cache_invalidated_by_new_and_removed_files(data_root):
+    UNDocumentIndex(data_root)
+
+    new_doc = data_root / "drafts" / "A_C.3_78_L.1.json"
+    _write_doc(new_doc, "A/C.3/78/L.1")
+    assert "A/C.3/78/L.1" in UNDocumentIndex(data_root).documents
+
+    new_doc.unlink()
+    assert "A/C.3/78/L.1" not in UNDocumentIndex(data_root).documents
+
+
+def test_index_without_cache(data_root):
+    index = UNDocumentIndex(data_root, use_cache=False)
+    assert "A/RES/78/1" in index.documents
+    assert not (data_root / INDEX_CACHE_NAME).exists()
+
+
+def test_index_cache_with_relative_root_ignores_other_cwd(data_root, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    UNDocumentIndex(data_root.relative_to(tmp_path))
+
+    # Same cache file seen through a different relative path must not return stale paths
+    monkeypatch.chdir(data_root)
+    index = UNDocumentIndex(data_root.relative_to(data_root))
+    assert index.find("A/RES/78/1").exists()
+
+
+def test_trace_without_data_keeps_symbols_only(data_root):
+    _write_doc(
+        data_root / "resolutions" / "A_RES_78_2.json", "A/RES/78/2",
+        agenda=[{"agenda_symbol": "A/78/251", "item_number": "5"}],
+    )
+    genealogy = DocumentGenealogy(UNDocumentIndex(data_root, use_cache=False))
+
+    full = genealogy.trace_backwards("A/RES/78/2")
+    assert full["agenda_items"][0]["data"]["metadata"]["symbol"] == "A/78/251"
+
+    light = genealogy.trace_backwards("A/RES/78/2", load_data=False)
+    assert light["agenda_items"][0]["data"] is None
+    assert light["agenda_items"][0]["found"] is True
+    assert light["resolution"]["data"]["metadata"]["symbol"] == "A/RES/78/2"
+
+    forwards = genealogy.trace_forwards("A/78/251", load_data=False)
+    assert [entry["symbol"] for entry in forwards["resolutions"]] == ["A/RES/78/2"]
+    assert forwards["resolutions"][0]["data"] is None
+
+
+def test_trace_from_draft_opens_each_document_once(data_root, monkeypatch):
+    _write_doc(
+        data_root / "drafts" / "A_C.3_78_L.1.json", "A/C.3/78/L.1",
+        agenda=[{"agenda_symbol": "A/78/251", "item_number": "5"}],
+    )
+    _write_doc(
+        data_root / "resolutions" / "A_RES_78_2.json", "A/RES/78/2",
+        related_documents={"drafts": [{"text": "A/C.3/78/L.1"}]},
+    )
+    index = UNDocumentIndex(data_root, use_cache=False)
+
+    loads = []
+    original_load = UNDocumentIndex.load
+
+    def counting_load(self, symbol):
+        loads.append(self._normalize_symbol(symbol))
+        return original_load(self, symbol)
+
+    monkeypatch.setattr(UNDocumentIndex, "load", counting_load)
+    tree = DocumentGenealogy(index).trace_from_draft("A/C.3/78/L.1")
+
+    assert [entry["symbol"] for entry in tree["resolutions"]] == ["A/RES/78/2"]
+    assert len(loads) == len(set(loads))
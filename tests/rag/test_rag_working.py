@@ -64,6 +64,11 @@ def test_get_value_with_ui_format():
     assert get_value({"full": "test", "display": "...", "truncated": True}) == "test"
 
 
+def test_get_value_with_untruncated_ui_cell():
+    """Untruncated UI cells carry only display; get_value must not return the dict."""
+    assert get_value({"display": "A/RES/78/220", "truncated": False}) == "A/RES/78/220"
+
+
 def test_get_value_with_raw_string():
     """Test get_value handles raw strings."""
     assert get_value("raw string") == "raw string"
@@ -265,6 +270,30 @@ def test_extract_text_fields_from_empty():
     assert len(texts) == 0
 
 
+def test_extract_text_fields_from_untruncated_ui_cells():
+    """Untruncated UI cells carry only display; their text must still be extracted."""
+    results = {
+        "columns": ["symbol", "title", "text"],
+        "rows": [
+            {
+                "symbol": {"display": "A/RES/78/220", "truncated": False},
+                "title": {"display": "Situation in Middle East", "truncated": False},
+                "text": {"display": "France supports the resolution.", "truncated": False},
+            },
+            {
+                "symbol": {"display": "A/RES/78/221", "truncated": False},
+                "title": {"display": "Climate action", "truncated": False},
+                "text": {"display": "", "truncated": False},
+            },
+        ],
+        "row_count": 2,
+        "truncated": False
+    }
+
+    texts = extract_text_fields(results)
+    assert texts == ["France supports the resolution.", "Climate action"]
+
+
 def test_extract_text_fields_respects_limit():
     """Test that text extraction respects MAX_RESULTS limit."""
     from rag.rag_summarize import MAX_RESULTS_FOR_SUMMARIZATION
@@ -0,0 +1,78 @@
+"""Tests for the batched document link lookup."""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from ui import app as ui_app
+from ui.app import DOCUMENT_LINKS_SQL, _fetch_document_links_uncached, symbol_to_docs_url
+
+
+def _render(symbols, ids):
+    compiled = DOCUMENT_LINKS_SQL.bindparams(symbols=symbols, ids=ids).compile(
+        dialect=postgresql.psycopg2.dialect(), compile_kwargs={"render_postcompile": True}
+    )
+    return str(compiled), compiled.params
+
+
+@pytest.mark.parametrize("symbols, ids, empty_type", [
+    ([], [3, 4], "VARCHAR"),
+    (["A/RES/78/220"], [], "INTEGER"),
+])
+def test_links_sql_renders_typed_empty_set(symbols, ids, empty_type):
+    sql, params = _render(symbols, ids)
+    where = sql.split("WHERE d.symbol", 1)[1]
+    assert f"(SELECT CAST(NULL AS {empty_type}) WHERE 1!=1)" in where
+    assert sorted(params.values(), key=str) == sorted(symbols + ids, key=str)
+
+
+class _FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, statement, params):
+        self.executed.append((statement, params))
+        return self
+
+    def all(self):
+        return self.rows
+
+
+@pytest.fixture
+def link_rows(monkeypatch):
+    """Stub app_engine.connect() to return the given (id, symbol, url) rows."""
+    connection = _FakeConnection([])
+
+    @contextmanager
+    def connect():
+        yield connection
+
+    monkeypatch.setattr(ui_app.app_engine, "connect", connect)
+    return connection
+
+
+def test_fetch_document_links_maps_symbols_and_ids(link_rows):
+    link_rows.rows = [
+        (1, "A/RES/78/220", "https://example.org/220.pdf"),
+        (2, "A/78/L.1", None),
+    ]
+    symbol_map, id_map = _fetch_document_links_uncached({"A/RES/78/220"}, {2})
+
+    # Rows reached through an id still fill in their symbol; no URL falls back to ODS
+    assert symbol_map == {
+        "A/RES/78/220": "https://example.org/220.pdf",
+        "A/78/L.1": symbol_to_docs_url("A/78/L.1"),
+    }
+    assert id_map == {1: "https://example.org/220.pdf", 2: symbol_to_docs_url("A/78/L.1")}
+    assert link_rows.executed == [(DOCUMENT_LINKS_SQL, {"symbols": ["A/RES/78/220"], "ids": [2]})]
+
+
+def test_fetch_document_links_with_only_ids(link_rows):
+    link_rows.rows = [(7, "A/RES/78/1", "https://example.org/1.pdf")]
+    symbol_map, id_map = _fetch_document_links_uncached(set(), {7})
+
+    assert symbol_map == {"A/RES/78/1": "https://example.org/1.pdf"}
+    assert id_map == {7: "https://example.org/1.pdf"}
+    assert link_rows.executed[0][1] == {"symbols": [], "ids": [7]}
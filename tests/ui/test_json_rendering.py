@@ -0,0 +1,38 @@
+"""Tests for the orjson-backed JSON parsing and rendering."""
+
+import json
+
+import pytest
+
+from ui.app import FastJSONResponse, app, json_loads, render_value
+
+
+def test_render_value_indents_json_values():
+    value = {"symbol": "A/RES/78/220", "title": "Côte d'Ivoire", "votes": {1: "yes"}}
+    rendered = render_value(value)
+
+    # Same shape as json.dumps(indent=2, ensure_ascii=False); int keys become strings
+    assert rendered == json.dumps(
+        {"symbol": "A/RES/78/220", "title": "Côte d'Ivoire", "votes": {"1": "yes"}},
+        ensure_ascii=False, indent=2,
+    )
+
+
+def test_render_value_passes_strings_through():
+    assert render_value("A/RES/78/220") == "A/RES/78/220"
+    assert render_value(None) == ""
+    assert render_value(12) == "12"
+
+
+def test_json_loads_errors_are_json_decode_errors():
+    assert json_loads('{"rows": [1, 2]}') == {"rows": [1, 2]}
+    with pytest.raises(json.JSONDecodeError):
+        json_loads("{not json")
+
+
+def test_json_endpoints_default_to_orjson_response():
+    assert app.router.default_response_class is FastJSONResponse
+
+    # Compact output; non-string keys are stringified as json.dumps would
+    body = FastJSONResponse({"rows": [{"symbol": "A/RES/78/220"}], 3: "x"}).body
+    assert body == b'{"rows":[{"symbol":"A/RES/78/220"}],"3":"x"}'
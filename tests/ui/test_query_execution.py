@@ -0,0 +1,216 @@
+"""Tests for how the UI wraps and runs user SQL."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from ui import app as ui_app
+from ui.app import MAX_ROWS, _fetch_rows, _fetch_rows_uncached, _limited_sql, _query_body
+
+
+@pytest.fixture
+def sqlite_engine(monkeypatch):
+    """Run queries against an in-memory SQLite database instead of Postgres."""
+    engine = create_engine("sqlite://")
+    monkeypatch.setattr(ui_app, "engine", engine)
+    return engine
+
+
+@pytest.fixture
+def counted_fetch(monkeypatch):
+    """Empty query cache in front of a stub database that records each query it runs."""
+    monkeypatch.setattr(ui_app, "_query_cache", type(ui_app._query_cache)())
+    monkeypatch.setattr(ui_app, "QUERY_CACHE_TTL", 60.0)
+    statements = []
+
+    def fetch(sql_query):
+        statements.append(sql_query)
+        return ["symbol"], [("A/RES/78/220",), ("A/RES/78/221",)], False
+
+    monkeypatch.setattr(ui_app, "_fetch_rows_uncached", fetch)
+    return statements
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for cache expiry."""
+    now = [1000.0]
+    monkeypatch.setattr(ui_app.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.parametrize("sql_query, expected", [
+    ("SELECT 1", "SELECT 1"),
+    ("  select 1;  ", "select 1"),
+    ("SELECT 1;;\n", "SELECT 1"),
+    ("SELECT 1 -- trailing comment", "SELECT 1 -- trailing comment"),
+    ("WITH t AS (SELECT 1 AS x) SELECT x FROM t;", "WITH t AS (SELECT 1 AS x) SELECT x FROM t"),
+    ("SELECT updated_at, deleted FROM documents", "SELECT updated_at, deleted FROM documents"),
+])
+def test_query_body_accepts_plain_selects(sql_query, expected):
+    assert _query_body(sql_query) == expected
+
+
+@pytest.mark.parametrize("sql_query", [
+    "EXPLAIN SELECT 1",
+    "EXPLAIN ANALYZE WITH t AS (SELECT 1) SELECT * FROM t",
+    "SELECT 1; SELECT 2",
+    "SELECT 1; -- done",
+    "WITH moved AS (DELETE FROM votes RETURNING *) SELECT * FROM moved",
+    "WITH t AS (UPDATE documents SET title = '' RETURNING id) SELECT * FROM t",
+    "SELECT * INTO copy FROM documents",
+    "selection_view",
+])
+def test_query_body_rejects_queries_that_cannot_be_wrapped(sql_query):
+    assert _query_body(sql_query) is None
+    assert _limited_sql(sql_query) is None
+
+
+def test_limited_sql_keeps_trailing_comment_inside_subquery():
+    limited = _limited_sql("SELECT symbol FROM documents ORDER BY date DESC -- newest first;")
+    assert limited.splitlines() == [
+        "SELECT * FROM (",
+        "SELECT symbol FROM documents ORDER BY date DESC -- newest first",
+        f") AS _limited LIMIT {MAX_ROWS + 1}",
+    ]
+
+
+def test_fetch_rows_runs_wrapped_query(sqlite_engine):
+    columns, rows, truncated = _fetch_rows_uncached("SELECT 1 AS x, 'a' AS y -- comment\n;")
+    assert columns == ["x", "y"]
+    assert [tuple(row) for row in rows] == [(1, "a")]
+    assert truncated is False
+
+
+def test_fetch_rows_truncates_past_max_rows(sqlite_engine):
+    sql_query = f"""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {MAX_ROWS + 10})
+        SELECT i FROM n ORDER BY i
+    """
+    columns, rows, truncated = _fetch_rows_uncached(sql_query)
+    assert truncated is True
+    assert [row[0] for row in rows] == list(range(1, MAX_ROWS + 1))
+
+
+def test_failing_query_runs_once(monkeypatch):
+    statements = []
+
+    def fail(sql_query, stream):
+        statements.append(sql_query)
+        raise OperationalError(sql_query, {}, Exception("statement timeout"))
+
+    monkeypatch.setattr(ui_app, "_read_rows", fail)
+    with pytest.raises(OperationalError):
+        _fetch_rows_uncached("SELECT * FROM documents")
+    assert statements == [_limited_sql("SELECT * FROM documents")]
+
+
+class _RecordingConnection:
+    """Stand-in for engine.connect() that records the options and SQL of each execute."""
+
+    def __init__(self):
+        self.executed = []
+        self._options = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execution_options(self, **options):
+        self._options = options
+        return self
+
+    def execute(self, statement):
+        self.executed.append((str(statement), self._options))
+        return self
+
+    def keys(self):
+        return ["QUERY PLAN"]
+
+    def fetchmany(self, size):
+        return [("Result  (cost=0.00..0.01 rows=1 width=4)",)]
+
+    def __iter__(self):
+        return iter(self.fetchmany(MAX_ROWS + 1))
+
+
+@pytest.fixture
+def recording_connection(monkeypatch):
+    connection = _RecordingConnection()
+    monkeypatch.setattr(ui_app, "engine", type("FakeEngine", (), {"connect": lambda self: connection})())
+    return connection
+
+
+@pytest.mark.parametrize("sql_query", [
+    "EXPLAIN SELECT 1",
+    "SELECT 1; SELECT 2",
+    "WITH moved AS (DELETE FROM votes RETURNING *) SELECT * FROM moved",
+])
+def test_unwrappable_query_runs_as_written_without_streaming(recording_connection, sql_query):
+    columns, rows, truncated = _fetch_rows_uncached(sql_query)
+
+    # A named (server-side) cursor only accepts SELECT/VALUES, so these must not stream
+    [(statement, options)] = recording_connection.executed
+    assert statement == sql_query
+    assert "stream_results" not in options
+    assert "yield_per" not in options
+    assert len(rows) == 1 and truncated is False
+
+
+def test_wrapped_query_streams(recording_connection):
+    _fetch_rows_uncached("SELECT 1")
+
+    [(statement, options)] = recording_connection.executed
+    assert statement == _limited_sql("SELECT 1")
+    assert options["stream_results"] is True
+
+
+def test_query_cache_reuses_results_until_ttl(counted_fetch, clock):
+    _fetch_rows("SELECT symbol FROM documents")
+    _fetch_rows("  SELECT symbol FROM documents\n")
+    assert len(counted_fetch) == 1
+
+    clock[0] += ui_app.QUERY_CACHE_TTL + 1
+    _fetch_rows("SELECT symbol FROM documents")
+    assert len(counted_fetch) == 2
+
+
+def test_query_cache_evicts_least_recently_used(counted_fetch, monkeypatch):
+    monkeypatch.setattr(ui_app, "QUERY_CACHE_SIZE", 2)
+    _fetch_rows("SELECT 1")
+    _fetch_rows("SELECT 2")
+    _fetch_rows("SELECT 1")  # hit: SELECT 2 is now the oldest
+    _fetch_rows("SELECT 3")
+    assert list(ui_app._query_cache) == ["SELECT 1", "SELECT 3"]
+
+    _fetch_rows("SELECT 2")
+    assert counted_fetch == ["SELECT 1", "SELECT 2", "SELECT 3", "SELECT 2"]
+
+
+def test_query_cache_disabled_with_zero_ttl(counted_fetch, monkeypatch):
+    monkeypatch.setattr(ui_app, "QUERY_CACHE_TTL", 0.0)
+    _fetch_rows("SELECT 1")
+    _fetch_rows("SELECT 1")
+    assert len(counted_fetch) == 2
+    assert not ui_app._query_cache
+
+
+def test_query_cache_skips_large_results(counted_fetch, monkeypatch):
+    monkeypatch.setattr(ui_app, "QUERY_CACHE_ENTRY_CHARS", len("A/RES/78/220") * 2 - 1)
+    _fetch_rows("SELECT 1")
+    _fetch_rows("SELECT 1")
+    assert len(counted_fetch) == 2
+    assert not ui_app._query_cache
+
+
+def test_query_cache_hands_out_copies(counted_fetch):
+    columns, rows, _ = _fetch_rows("SELECT 1")
+    columns.append("extra")
+    rows.clear()
+
+    columns, rows, _ = _fetch_rows("SELECT 1")
+    assert len(counted_fetch) == 1
+    assert columns == ["symbol"]
+    assert rows == [("A/RES/78/220",), ("A/RES/78/221",)]
@@ -17,6 +17,27 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from un_gym import UNDeliberationEnv, load_trajectory, trajectory_to_episode, Stage, Action
 
 
+# (name, index, index subtracted from it or None), shared by the scalar and matrix extractors
+STATE_FEATURES = (
+    ('is_sponsor', 6, None),
+    ('sponsor_count', 5, None),
+    ('committee_support', 7, 8),  # yes - no
+    ('plenary_support', 10, 11),  # yes - no
+    ('in_draft', 0, None),  # stage == DRAFT
+    ('in_committee', 1, None),  # stage == COMMITTEE_VOTE
+    ('in_plenary', 2, None),  # stage == PLENARY_VOTE
+)
+
+
+def _feature_values(states):
+    """STATE_FEATURES over the last axis, so it works on one state vector or a matrix of them."""
+    states = np.asarray(states)
+    return {
+        name: states[..., index] if minus is None else states[..., index] - states[..., minus]
+        for name, index, minus in STATE_FEATURES
+    }
+
+
 def extract_state_features(state_vec):
     """
     Extract interpretable features from state vector.
@@ -30,16 +51,19 @@ def extract_state_features(state_vec):
     - [10:13]: plenary votes (yes, no, abstain)
     - [13]: timestep
     """
-    features = {
-        'is_sponsor': state_vec[6],
-        'sponsor_count': state_vec[5],
-        'committee_support': state_vec[7] - state_vec[8],  # yes - no
-        'plenary_support': state_vec[10] - state_vec[11],  # yes - no
-        'in_draft': state_vec[0],  # stage == DRAFT
-        'in_committee': state_vec[1],  # stage == COMMITTEE_VOTE
-        'in_plenary': state_vec[2],  # stage == PLENARY_VOTE
-    }
-    return features
+    # [()] turns the 0-d arrays from a single vector back into scalars
+    return {name: value[()] for name, value in _feature_values(state_vec).items()}
+
+
+def extract_feature_matrix(state_matrix):
+    """
+    Vectorized extract_state_features over a (N, 14) matrix of state vectors.
+
+    Returns (feature_names, feature_matrix) with one column per feature, in the
+    same order as extract_state_features.
+    """
+    columns = _feature_values(state_matrix)
+    return list(columns.keys()), np.column_stack(list(columns.values()))
 
 
 def compute_feature_expectations(episodes):
@@ -78,19 +102,19 @@ def simple_irl(expert_episodes, n_iterations=50, lr=0.1):
     """
     print("Running simplified IRL...")
 
-    # Extract features from all states
-    all_states = []
-    all_rewards = []
+    # Fill preallocated state/reward arrays, then build features column-wise
+    n_transitions = sum(len(episode) for episode in expert_episodes)
+    state_matrix = np.empty((n_transitions, 14))
+    reward_vector = np.empty(n_transitions)
 
+    i = 0
     for episode in expert_episodes:
         for state, action, next_state, reward, done in episode:
-            all_states.append(extract_state_features(state.to_vec()))
-            all_rewards.append(reward)
+            state_matrix[i] = state.to_vec()
+            reward_vector[i] = reward
+            i += 1
 
-    # Convert to matrix
-    feature_names = list(all_states[0].keys())
-    feature_matrix = np.array([[s[k] for k in feature_names] for s in all_states])
-    reward_vector = np.array(all_rewards)
+    feature_names, feature_matrix = extract_feature_matrix(state_matrix)
 
     print(f"  Feature matrix shape: {feature_matrix.shape}")
     print(f"  Reward vector shape: {reward_vector.shape}")
@@ -10,6 +10,7 @@ import argparse
 import numpy as np
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 from pathlib import Path
 import sys
@@ -28,8 +29,9 @@ class WorldModel(nn.Module):
         self.state_dim = state_dim
         self.action_dim = action_dim
 
-        # One-hot encode actions
+        # One-hot encode actions by row lookup into a fixed identity table
         input_dim = state_dim + action_dim
+        self.register_buffer("action_onehot_table", torch.eye(action_dim), persistent=False)
 
         self.net = nn.Sequential(
             nn.Linear(input_dim, hidden_dim),
@@ -39,6 +41,21 @@ class WorldModel(nn.Module):
             nn.Linear(hidden_dim, state_dim),
         )
 
+    def encode_inputs(self, state, action):
+        """
+        Args:
+            state: (batch, state_dim)
+            action: (batch,) - integer actions
+        Returns:
+            x: (batch, state_dim + action_dim) - state concatenated with one-hot action
+        """
+        action_onehot = F.embedding(action.long(), self.action_onehot_table).to(state.dtype)
+        return torch.cat([state, action_onehot], dim=1)
+
+    def forward_pre_encoded(self, x):
+        """Predict next state from inputs already built by encode_inputs."""
+        return self.net(x)
+
     def forward(self, state, action):
         """
         Args:
@@ -47,14 +64,23 @@ class WorldModel(nn.Module):
         Returns:
             next_state: (batch, state_dim)
         """
-        # One-hot encode actions
-        action_onehot = torch.zeros(action.shape[0], self.action_dim)
-        action_onehot[torch.arange(action.shape[0]), action.long()] = 1.0
+        return self.forward_pre_encoded(self.encode_inputs(state, action))
 
-        # Concatenate state and action
-        x = torch.cat([state, action_onehot], dim=1)
 
-        return self.net(x)
+def fit_output_layer_lstsq(model, train_x, train_next_states):
+    """
+    Fit the output Linear layer in closed form, keeping the hidden layers at their init.
+
+    With no more transitions than hidden units the random ReLU features already span the
+    targets, so one least-squares solve reaches the loss Adam would only approach.
+    """
+    output_layer = model.net[-1]
+    with torch.no_grad():
+        features = model.net[:-1](train_x)
+        design = torch.cat([features, torch.ones(len(features), 1)], dim=1)
+        solution = torch.linalg.lstsq(design, train_next_states).solution
+        output_layer.weight.copy_(solution[:-1].T)
+        output_layer.bias.copy_(solution[-1])
 
 
 def main():
@@ -67,14 +93,35 @@ def main():
                         help="Training epochs")
     parser.add_argument("--lr", type=float, default=0.01,
                         help="Learning rate")
+    parser.add_argument("--optimizer", choices=["adam", "lbfgs", "lstsq"], default="adam",
+                        help="Optimizer; each lbfgs epoch runs up to 20 inner iterations, "
+                             "so a handful of epochs is enough; lstsq solves the output layer "
+                             "in one step and ignores --epochs (only when there are no more "
+                             "training transitions than hidden units, otherwise adam is used)")
+    parser.add_argument("--compile", action="store_true",
+                        help="Compile the MLP with torch.compile (pays off for long runs)")
+    parser.add_argument("--bf16", action="store_true",
+                        help="Run the training forward pass under BF16 autocast (CPUs with BF16 support)")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="CPU threads for PyTorch ops (0 keeps PyTorch's default); "
+                             "the 14->64->64->14 MLP is too small to benefit from more than one")
     args = parser.parse_args()
 
+    if args.threads > 0:
+        # Per-layer work is tiny, so OpenMP fork/join would dominate with more threads
+        torch.set_num_threads(args.threads)
+        torch.set_num_interop_threads(args.threads)
+
     print("=" * 60)
     print("WORLD MODEL TRAINING - MINIMAL DEMO")
     print("=" * 60)
     print(f"Trajectory: {args.trajectory}")
     print(f"Country: {args.country}")
     print(f"Epochs: {args.epochs}")
+    print(f"Optimizer: {args.optimizer}")
+    print(f"Threads: {torch.get_num_threads()}")
+    print(f"Compile: {args.compile}")
+    print(f"BF16 autocast: {args.bf16}")
     print()
 
     # Load trajectory
@@ -117,10 +164,11 @@ def main():
         print("Using all data for training (no test set)")
     print()
 
-    # Convert to tensors
-    train_states = torch.tensor([t[0] for t in train_transitions], dtype=torch.float32)
-    train_actions = torch.tensor([t[1] for t in train_transitions], dtype=torch.float32)
-    train_next_states = torch.tensor([t[2] for t in train_transitions], dtype=torch.float32)
+    # Convert to tensors: stack the per-transition arrays once in NumPy and let
+    # the tensors share that memory instead of boxing every element
+    train_states = torch.from_numpy(np.stack([t[0] for t in train_transitions]).astype(np.float32))
+    train_actions = torch.from_numpy(np.array([t[1] for t in train_transitions], dtype=np.float32))
+    train_next_states = torch.from_numpy(np.stack([t[2] for t in train_transitions]).astype(np.float32))
 
     print(f"Training data shapes:")
     print(f"  States: {train_states.shape}")
@@ -130,29 +178,62 @@ def main():
 
     # Initialize model
     model = WorldModel(state_dim=14, action_dim=5)
-    optimizer = optim.Adam(model.parameters(), lr=args.lr)
+    hidden_dim = model.net[-1].in_features
+    if args.optimizer == "lstsq" and len(train_transitions) > hidden_dim:
+        # Past hidden_dim transitions the fixed random features can no longer fit every target
+        print(f"Warning: lstsq needs at most {hidden_dim} training transitions "
+              f"(got {len(train_transitions)}); falling back to adam")
+        args.optimizer = "adam"
+    if args.optimizer == "lbfgs":
+        # Full-batch, fixed data: a quasi-Newton step converges in far fewer passes
+        optimizer = optim.LBFGS(model.parameters(), lr=args.lr, max_iter=20, history_size=10)
+    elif args.optimizer == "lstsq":
+        optimizer = None
+    else:
+        optimizer = optim.Adam(model.parameters(), lr=args.lr)
     criterion = nn.MSELoss()
 
+    # Training inputs are fixed, so one-hot encode actions once up front
+    train_x = model.encode_inputs(train_states, train_actions)
+
+    # Optionally fuse Linear/ReLU stack; the compiled module shares model's parameters
+    train_net = torch.compile(model.net) if args.compile else model.forward_pre_encoded
+
     print("Training world model...")
     print("-" * 60)
 
-    # Training loop
-    losses = []
-    for epoch in range(args.epochs):
+    def closure():
         optimizer.zero_grad()
 
-        # Forward pass
-        pred_next_states = model(train_states, train_actions)
-        loss = criterion(pred_next_states, train_next_states)
+        # Forward pass (weights, gradients and loss stay FP32 under autocast)
+        with torch.autocast(device_type="cpu", dtype=torch.bfloat16, enabled=args.bf16):
+            pred_next_states = train_net(train_x)
+        loss = criterion(pred_next_states.float(), train_next_states)
 
         # Backward pass
         loss.backward()
-        optimizer.step()
+        return loss
+
+    losses = []
+    if args.optimizer == "lstsq":
+        # Closed-form fit of the output layer; no epochs to run
+        with torch.no_grad():
+            losses.append(criterion(model.forward_pre_encoded(train_x), train_next_states).item())
+            fit_output_layer_lstsq(model, train_x, train_next_states)
+            losses.append(criterion(model.forward_pre_encoded(train_x), train_next_states).item())
+        print(f"Least-squares fit: Loss = {losses[0]:.6f} -> {losses[-1]:.6f}")
+    else:
+        # Training loop (Adam and LBFGS both accept a closure and return its first loss).
+        # Losses stay in a tensor; only logged epochs sync to a Python float.
+        loss_buf = torch.empty(args.epochs)
+        for epoch in range(args.epochs):
+            loss = optimizer.step(closure)
 
-        losses.append(loss.item())
+            loss_buf[epoch] = loss.detach()
 
-        if (epoch + 1) % 20 == 0 or epoch == 0:
-            print(f"Epoch {epoch+1:3d}/{args.epochs}: Loss = {loss.item():.6f}")
+            if (epoch + 1) % 20 == 0 or epoch == 0:
+                print(f"Epoch {epoch+1:3d}/{args.epochs}: Loss = {loss.item():.6f}")
+        losses = loss_buf.tolist()
 
     print("-" * 60)
     print(f"Final training loss: {losses[-1]:.6f}")
@@ -161,9 +242,10 @@ def main():
     # Evaluate on test set
     if test_transitions:
         print("Evaluating on test set...")
-        test_state = torch.tensor([test_transitions[0][0]], dtype=torch.float32)
-        test_action = torch.tensor([test_transitions[0][1]], dtype=torch.float32)
-        test_next_state = torch.tensor([test_transitions[0][2]], dtype=torch.float32)
+        test_s, test_a, test_s_next = test_transitions[0][:3]
+        test_state = torch.from_numpy(np.asarray(test_s, dtype=np.float32)).unsqueeze(0)
+        test_action = torch.from_numpy(np.asarray(test_a, dtype=np.float32)).unsqueeze(0)
+        test_next_state = torch.from_numpy(np.asarray(test_s_next, dtype=np.float32)).unsqueeze(0)
 
         with torch.no_grad():
             pred = model(test_state, test_action)
@@ -3,28 +3,44 @@
 from __future__ import annotations
 
 import csv
+import functools
 import json
 import logging
 import os
 import secrets
+import string
+import threading
+import time
 import hashlib
+import itertools
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from io import StringIO
 from pathlib import Path
 from typing import Any, Dict, List, Tuple, Set, Optional
 import re
 from urllib.parse import quote, urlparse
+import anyio.to_thread
 from dotenv import load_dotenv
+import orjson
 
-from fastapi import FastAPI, Form, Request, HTTPException, status, Depends
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the same error
+json_loads = orjson.loads
+
+from fastapi import BackgroundTasks, FastAPI, Form, Request, HTTPException, status, Depends
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import text
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import escape
+import psycopg2.extensions
+from sqlalchemy import Integer, String, bindparam, event, text
 from sqlalchemy.exc import SQLAlchemyError
 
-from db.config import engine, get_session, is_supabase, USE_DEV_DB
-from db.models import Document
+from db.config import app_engine, engine, is_supabase, USE_DEV_DB
 from rag.text_to_sql import generate_sql
 from rag.rag_summarize import summarize_results
 from rag.rag_qa import answer_question
@@ -39,7 +55,7 @@ load_dotenv()
 
 # Set up logging
 from utils.logging_config import get_logger
-logger = get_logger(__name__, log_file="app.log")
+logger = get_logger(__name__, log_file="app.log", use_queue=True)
 
 # Log connection status on startup
 if is_supabase and not USE_DEV_DB:
@@ -53,7 +69,16 @@ else:
 _logged_prompt_style = False
 
 APP_DIR = Path(__file__).parent
-templates = Jinja2Templates(directory=str(APP_DIR / "templates"))
+# Templates only change on deploy: skip per-render mtime checks and keep compiled
+# bytecode on disk so fresh workers don't re-parse them (set TEMPLATE_AUTO_RELOAD=true when editing)
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader(str(APP_DIR / "templates")),
+        autoescape=True,
+        auto_reload=os.getenv('TEMPLATE_AUTO_RELOAD', 'false').lower() == 'true',
+        bytecode_cache=FileSystemBytecodeCache(),
+    )
+)
 
 # Verify static directory exists
 STATIC_DIR = APP_DIR / "static"
@@ -65,6 +90,12 @@ else:
 MAX_ROWS = 500
 MAX_DISPLAY_CHARS = 600
 ALLOWED_PREFIXES = ("select", "with", "explain")
+# Matches the leading keyword in place, without stripping or lowercasing a copy of the query
+ALLOWED_QUERY_PATTERN = re.compile(r"\s*(?:%s)\b" % "|".join(ALLOWED_PREFIXES), re.IGNORECASE)
+# Queries that can be wrapped in the LIMIT subquery: SELECT/WITH, minus anything that
+# mentions a data-modifying keyword or SELECT INTO (false positives just skip the wrapper)
+SUBQUERY_PREFIX_PATTERN = re.compile(r"(?:select|with)\b", re.IGNORECASE)
+NOT_SUBQUERY_PATTERN = re.compile(r"\b(?:insert|update|delete|merge|into)\b", re.IGNORECASE)
 LONG_TEXT_COLUMNS = {
     "text",
     "context",
@@ -84,26 +115,106 @@ DOCUMENT_ID_COLUMN_HINTS = {
     "draft_id",
     "agenda_id",
 }
-SYMBOL_PATTERN = re.compile(r"[A-Z]/[A-Z0-9]", re.IGNORECASE)
+# Hint names plus anything ending in document_id / _doc_id, as one full-match alternation
+DOCUMENT_ID_COLUMN_PATTERN = re.compile(
+    "|".join(sorted(DOCUMENT_ID_COLUMN_HINTS)) + r"|.*document_id|.*_doc_id", re.DOTALL
+)
+# Matched against the raw value, so it also accepts the "_" and backslash separators
+# that normalize_symbol maps to "/"
+SYMBOL_PATTERN = re.compile(r"[A-Z][/_\\][A-Z0-9]", re.IGNORECASE)
 
-SAMPLE_QUERIES = [
+SAMPLE_QUERIES = (
     "SELECT symbol, title, date FROM documents WHERE doc_type = 'resolution' ORDER BY date DESC LIMIT 5;",
     "SELECT d.symbol, v.vote_type, a.name FROM documents d JOIN votes v ON v.document_id = d.id JOIN actors a ON a.id = v.actor_id WHERE d.symbol = 'A/RES/78/220' LIMIT 10;",
     "WITH vote_summary AS (\n    SELECT d.symbol, v.vote_type, COUNT(*) AS count\n    FROM documents d\n    JOIN votes v ON v.document_id = d.id\n    WHERE d.doc_type = 'resolution'\n    GROUP BY d.symbol, v.vote_type\n)\nSELECT * FROM vote_summary WHERE symbol = 'A/RES/78/220';",
     """WITH target_resolution AS (\n    SELECT id, symbol, title\n    FROM documents\n    WHERE symbol = 'A/RES/78/220'\n)\nSELECT 'resolution' AS link_type, doc.doc_type, doc.symbol, doc.title\nFROM target_resolution tr\nJOIN documents doc ON doc.id = tr.id\nUNION ALL\nSELECT rel.relationship_type, src.doc_type, src.symbol, COALESCE(src.title, src.doc_metadata->'metadata'->>'title') AS title\nFROM target_resolution tr\nJOIN document_relationships rel ON rel.target_id = tr.id\nJOIN documents src ON src.id = rel.source_id\nORDER BY link_type;""",
-]
+)
 
 # Example questions for demo mode
-DEMO_QUESTIONS = [
+DEMO_QUESTIONS = (
     "Why did countries vote against A/RES/78/244?",
     "Which countries abstained from voting on Iran-related resolutions in session 78?",
-    "What did France say about climate change in plenary meetings?"]
+    "What did France say about climate change in plenary meetings?",
+)
+
+# Sync endpoints (DB queries, LLM calls) run in Starlette's worker threadpool; size it
+# to the expected concurrency so slow queries don't queue behind each other
+THREADPOOL_SIZE = int(os.getenv('UI_THREADPOOL_SIZE', '40'))
+
+
+@functools.lru_cache(maxsize=64)
+def _static_fingerprint(path: str, mtime_ns: int) -> str:
+    return hashlib.blake2b((STATIC_DIR / path).read_bytes(), digest_size=6).hexdigest()
+
+
+def static_url(path: str) -> str:
+    """URL for a file under /static with a content hash, so it can be cached as immutable."""
+    mtime_ns = (STATIC_DIR / path).stat().st_mtime_ns
+    return f"/static/{path}?v={_static_fingerprint(path, mtime_ns)}"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers keep fingerprinted (?v=...) files for a year."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        # Only URLs from static_url carry v=; bare paths keep ETag revalidation
+        if b"v=" in scope.get("query_string", b""):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+# Static page data lives in the template globals, not in each request's context
+# (escaped once here rather than by autoescape on every render)
+templates.env.globals.update(
+    demo_questions=tuple(escape(question) for question in DEMO_QUESTIONS),
+    static_url=static_url,
+)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (a project dependency) instead of json.dumps."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    logger.info(f"🧵 Worker threadpool size: {THREADPOOL_SIZE}")
+    # Compile the templates (or load them from the bytecode cache) before the first request
+    for template_name in ("index.html", "login.html"):
+        templates.get_template(template_name)
+    # The orchestrator holds only the OpenAI client and tool tables, so one instance serves every request
+    try:
+        app.state.orchestrator = MultiStepOrchestrator()
+    except Exception as e:
+        logger.warning(f"Orchestrator not initialised at startup: {e}")
+        app.state.orchestrator = None
+    yield
 
-app = FastAPI(title="UN Documents SQL UI", description="Text-heavy SQL workbench for the UN database")
+
+def get_orchestrator(request: Request) -> MultiStepOrchestrator:
+    """Return the shared orchestrator, building it on demand if startup could not."""
+    orchestrator = getattr(request.app.state, "orchestrator", None)
+    if orchestrator is None:
+        orchestrator = MultiStepOrchestrator()
+        request.app.state.orchestrator = orchestrator
+    return orchestrator
+
+
+app = FastAPI(
+    title="UN Documents SQL UI",
+    description="Text-heavy SQL workbench for the UN database",
+    lifespan=lifespan,
+    # Dicts returned by the JSON endpoints are serialized by orjson
+    default_response_class=FastJSONResponse,
+)
 
 # Mount static files
 if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    app.mount("/static", CachedStaticFiles(directory=str(STATIC_DIR)), name="static")
     logger.info(f"Mounted static files from {STATIC_DIR}")
 else:
     logger.error(f"Cannot mount static files: directory {STATIC_DIR} does not exist")
@@ -152,7 +263,10 @@ def is_authenticated(request: Request) -> bool:
     return secrets.compare_digest(token, expected)
 
 
-def require_auth(request: Request):
+# Handlers and dependencies that never block (auth, login/logout, the static home page)
+# are async so they run on the event loop; handlers that hit the database or an LLM stay
+# sync and run in the worker threadpool (see THREADPOOL_SIZE).
+async def require_auth(request: Request):
     if not ENABLE_AUTH:
         return True
     if is_authenticated(request):
@@ -183,35 +297,78 @@ def _safe_next_url(next_url: Optional[str]) -> str:
     return f"{path}{query}"
 
 
-def format_value(value: Any) -> Dict[str, Any]:
-    """Convert arbitrary DB values into a display-friendly payload."""
+class JSONText(str):
+    """JSON/JSONB cell kept as the server's JSON text instead of a parsed dict/list."""
+
+
+def render_value(value: Any) -> str:
+    """Render a DB value as the full string shown in results and API payloads."""
+    # Called once per result cell, so check the common str case first
+    if value.__class__ is str:
+        return value
     if value is None:
-        rendered = ""
-    elif isinstance(value, (dict, list)):
-        rendered = json.dumps(value, ensure_ascii=False, indent=2)
-    else:
-        rendered = str(value)
+        return ""
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return str(value)
+
+
+def format_value(value: Any) -> Dict[str, Any]:
+    """
+    Convert arbitrary DB values into a display-friendly payload.
 
-    is_truncated = len(rendered) > MAX_DISPLAY_CHARS
-    display_value = f"{rendered[:MAX_DISPLAY_CHARS]}…" if is_truncated else rendered
+    "full" is only included when it differs from "display" (truncated cells), so short
+    cells aren't stored and sent to the page twice.
+    """
+    rendered = render_value(value)
+    if len(rendered) <= MAX_DISPLAY_CHARS:
+        return {"display": rendered, "truncated": False}
     return {
-        "display": display_value,
+        "display": rendered[:MAX_DISPLAY_CHARS] + "…",
         "full": rendered,
-        "truncated": is_truncated,
+        "truncated": True,
     }
 
 
+def format_number(value: Any) -> Dict[str, Any]:
+    """format_value for int/float columns: never long enough to truncate."""
+    rendered = "" if value is None else str(value)
+    return {"display": rendered, "truncated": False}
+
+
+def format_long_text_value(value: Any) -> Dict[str, Any]:
+    """format_value for LONG_TEXT_COLUMNS, with a shorter preview and the full text attached."""
+    formatted = format_value(value)
+    formatted["long_column"] = True
+    if isinstance(value, str) and len(value) > LONG_TEXT_PREVIEW_CHARS:
+        preview = value[:LONG_TEXT_PREVIEW_CHARS].rstrip()
+        formatted["display"] = f"{preview}…"
+        formatted["full"] = value
+        formatted["long_text"] = value
+    return formatted
+
+
+# Separators to "/" and ASCII letters to upper case (UN symbols are ASCII)
+_SYMBOL_TRANSLATION = str.maketrans({
+    "\\": "/",
+    "_": "/",
+    **{letter: letter.upper() for letter in string.ascii_lowercase},
+})
+
+
 def normalize_symbol(symbol: str) -> str:
     """Normalize symbols like A_RES_78_220 -> A/RES/78/220."""
-    return symbol.strip().upper().replace("\\", "/").replace("_", "/")
+    # One translate() pass does both the separator swap and the upper-casing
+    return symbol.strip().translate(_SYMBOL_TRANSLATION)
 
 
 def looks_like_symbol(value: str) -> bool:
     """Heuristic check to avoid treating arbitrary text as a document symbol."""
-    normalized = normalize_symbol(value)
-    if "/" not in normalized:
+    # Most cells (names, dates, prose without separators) fail the substring checks in C
+    # and never enter the regex engine or build a normalized copy
+    if "/" not in value and "_" not in value and "\\" not in value:
         return False
-    return bool(SYMBOL_PATTERN.search(normalized))
+    return SYMBOL_PATTERN.search(value) is not None
 
 
 def symbol_to_docs_url(symbol: str, language: str = "en") -> str:
@@ -233,175 +390,449 @@ def symbol_to_docs_url(symbol: str, language: str = "en") -> str:
     return f"https://documents.un.org/api/symbol/access?s={symbol_lower}&l={language}&t=pdf"
 
 
-def pick_pdf_url(metadata: Dict[str, Any]) -> Optional[str]:
-    """Select the best PDF URL from metadata, preferring English when available."""
-    if not metadata:
-        return None
-
-    files = metadata.get("files")
-    if not files:
-        files = metadata.get("metadata", {}).get("files")
-
-    if not files or not isinstance(files, list):
-        return None
+# Best PDF URL per document, picked in Postgres so only (id, symbol, url) comes back, never
+# the JSONB: doc_metadata.files, or metadata.files when that is missing or an empty/false
+# JSON value; then the first English entry, else the first entry. A files value that isn't
+# an array gives no URL (symbol_to_docs_url is the fallback).
+DOCUMENT_LINKS_SQL = text("""
+SELECT d.id, d.symbol, (
+    SELECT entry ->> 'url'
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(files.list) = 'array' THEN files.list ELSE '[]'::jsonb END
+    ) WITH ORDINALITY AS file_entries(entry, position)
+    ORDER BY strpos(lower(COALESCE(entry ->> 'language', '')), 'english') > 0 DESC, position
+    LIMIT 1
+) AS url
+FROM documents d
+CROSS JOIN LATERAL (
+    SELECT CASE
+        WHEN d.doc_metadata -> 'files' IS NULL
+             OR d.doc_metadata -> 'files' IN ('null', '[]', '{}', '""', 'false', '0')
+        THEN d.doc_metadata #> '{metadata,files}'
+        ELSE d.doc_metadata -> 'files'
+    END AS list
+) AS files
+WHERE d.symbol IN :symbols OR d.id IN :ids
+""").bindparams(
+    bindparam("symbols", type_=String, expanding=True),
+    bindparam("ids", type_=Integer, expanding=True),
+)
 
-    def _language_key(entry: Dict[str, Any]) -> str:
-        return (entry.get("language") or "").lower()
 
-    english_entry = next((f for f in files if "english" in _language_key(f)), None)
-    entry = english_entry or files[0]
-    return entry.get("url")
+# Symbol/id -> PDF link (None when no document matched), shared across requests. Links only
+# change when documents are reloaded; DOCUMENT_LINK_CACHE_TTL=0 disables the cache.
+DOCUMENT_LINK_CACHE_TTL = float(os.getenv('DOCUMENT_LINK_CACHE_TTL', '3600'))
+DOCUMENT_LINK_CACHE_SIZE = 10_000
+_link_cache: "OrderedDict[Tuple[str, Any], Tuple[float, Optional[str]]]" = OrderedDict()
+_link_cache_lock = threading.Lock()
+# Runs fetch_document_links beside execute_sql's cell formatting (see execute_sql)
+_document_link_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="doc-links")
 
 
 def fetch_document_links(symbols: Set[str], ids: Set[int]) -> Tuple[Dict[str, str], Dict[int, str]]:
     """Fetch document -> PDF link mappings for the provided identifiers."""
     if not symbols and not ids:
         return {}, {}
+    if DOCUMENT_LINK_CACHE_TTL <= 0:
+        return _fetch_document_links_uncached(symbols, ids)
 
-    session = get_session()
     symbol_map: Dict[str, str] = {}
     id_map: Dict[int, str] = {}
+    missing_symbols: Set[str] = set()
+    missing_ids: Set[int] = set()
+    now = time.monotonic()
+    with _link_cache_lock:
+        for kind, refs, found, missing in (
+            ("symbol", symbols, symbol_map, missing_symbols),
+            ("id", ids, id_map, missing_ids),
+        ):
+            for ref in refs:
+                cached = _link_cache.get((kind, ref))
+                if cached is None or cached[0] <= now:
+                    missing.add(ref)
+                    continue
+                _link_cache.move_to_end((kind, ref))
+                if cached[1] is not None:
+                    found[ref] = cached[1]
+
+    if missing_symbols or missing_ids:
+        fetched_symbols, fetched_ids = _fetch_document_links_uncached(missing_symbols, missing_ids)
+        symbol_map.update(fetched_symbols)
+        id_map.update(fetched_ids)
+
+        expires = time.monotonic() + DOCUMENT_LINK_CACHE_TTL
+        with _link_cache_lock:
+            for kind, refs, fetched in (
+                ("symbol", missing_symbols, fetched_symbols),
+                ("id", missing_ids, fetched_ids),
+            ):
+                for ref in refs:
+                    _link_cache[(kind, ref)] = (expires, fetched.get(ref))
+                    _link_cache.move_to_end((kind, ref))
+            while len(_link_cache) > DOCUMENT_LINK_CACHE_SIZE:
+                _link_cache.popitem(last=False)
+
+    return symbol_map, id_map
 
-    try:
-        query_symbols = list(symbols)
-        if query_symbols:
-            docs = session.query(Document).filter(Document.symbol.in_(query_symbols)).all()
-            for doc in docs:
-                url = pick_pdf_url(doc.doc_metadata)
-                if not url:
-                    # Fallback: Use ODS URL (reliable for most document types)
-                    if doc.symbol:
-                        url = symbol_to_docs_url(doc.symbol, language="en")
-                if url:
-                    symbol_map[normalize_symbol(doc.symbol)] = url
-                    id_map[doc.id] = url
-
-        remaining_ids = [doc_id for doc_id in ids if doc_id not in id_map]
-        if remaining_ids:
-            docs = session.query(Document).filter(Document.id.in_(remaining_ids)).all()
-            for doc in docs:
-                url = pick_pdf_url(doc.doc_metadata)
-                if not url:
-                    # Fallback: Use ODS URL (reliable for most document types)
-                    if doc.symbol:
-                        url = symbol_to_docs_url(doc.symbol, language="en")
-                if url:
-                    symbol_map.setdefault(normalize_symbol(doc.symbol), url)
-                    id_map[doc.id] = url
-
-    finally:
-        session.close()
+
+def _fetch_document_links_uncached(symbols: Set[str], ids: Set[int]) -> Tuple[Dict[str, str], Dict[int, str]]:
+    symbol_map: Dict[str, str] = {}
+    id_map: Dict[int, str] = {}
+
+    # One round-trip for both kinds of reference; a plain connection, no ORM Session needed
+    with app_engine.connect() as connection:
+        rows = connection.execute(DOCUMENT_LINKS_SQL, {"symbols": list(symbols), "ids": list(ids)}).all()
+
+    for doc_id, symbol, url in rows:
+        if not url:
+            # Fallback: Use ODS URL (reliable for most document types)
+            url = symbol_to_docs_url(symbol, language="en")
+        id_map[doc_id] = url
+        # Documents matched by symbol win over ones only reached through an id column
+        if symbol in symbols:
+            symbol_map[normalize_symbol(symbol)] = url
+        else:
+            symbol_map.setdefault(normalize_symbol(symbol), url)
 
     return symbol_map, id_map
 
 
-def annotate_document_links(formatted_rows: List[Dict[str, Dict[str, Any]]], raw_rows: List[Dict[str, Any]]) -> None:
-    """Attach PDF links to result cells when we can infer a document reference."""
-    if not formatted_rows:
-        return
+def is_document_id_column(column_lower: str) -> bool:
+    """Whether integer values in this (lowercased) column name refer to documents.id."""
+    return DOCUMENT_ID_COLUMN_PATTERN.fullmatch(column_lower) is not None
+
+
+def collect_document_refs(raw_rows: List[Dict[str, Any]]) -> Tuple[List[Tuple[str, bool, bool]], Set[str], Set[int], Dict[str, str]]:
+    """
+    Scan raw result rows for document references.
+
+    Returns (column_info, symbol_refs, id_refs, normalized_values) for apply_document_links.
+    """
+    # Classify each column once, not per cell: (column, is symbol column, is document id column).
+    # Other columns can only hold a reference if they are text (looks_like_symbol), so numeric,
+    # date and JSON columns drop out here; a vote-count query ends up with nothing to scan.
+    column_info = []
+    for column in (raw_rows[0] if raw_rows else ()):
+        column_lower = column.lower()
+        is_symbol_column = "symbol" in column_lower
+        is_id_column = is_document_id_column(column_lower)
+        if not (is_symbol_column or is_id_column):
+            # Postgres columns are homogeneously typed, so one non-NULL value decides
+            sample = next((row[column] for row in raw_rows if row[column] is not None), None)
+            if sample.__class__ is not str:
+                continue
+        column_info.append((column, is_symbol_column, is_id_column))
 
     symbol_refs: Set[str] = set()
     id_refs: Set[int] = set()
+    # Repeated values (symbols down a column, stage names, ...) are normalized once for both passes
+    normalized_values: Dict[str, str] = {}
 
     for raw_row in raw_rows:
-        for column, value in raw_row.items():
-            if value is None:
+        for column, is_symbol_column, is_id_column in column_info:
+            value = raw_row[column]
+            if value is None or value.__class__ is JSONText:
                 continue
-            column_lower = column.lower()
 
             if isinstance(value, str):
-                if "symbol" in column_lower or looks_like_symbol(value):
-                    symbol_refs.add(normalize_symbol(value))
-            elif isinstance(value, int):
-                if column_lower in DOCUMENT_ID_COLUMN_HINTS or column_lower.endswith("document_id") or column_lower.endswith("_doc_id"):
-                    id_refs.add(value)
-
-    symbol_map, id_map = fetch_document_links(symbol_refs, id_refs)
+                if is_symbol_column or looks_like_symbol(value):
+                    normalized = normalized_values.get(value)
+                    if normalized is None:
+                        normalized = normalized_values[value] = normalize_symbol(value)
+                    symbol_refs.add(normalized)
+            elif is_id_column and isinstance(value, int):
+                id_refs.add(value)
+
+    return column_info, symbol_refs, id_refs, normalized_values
+
+
+def apply_document_links(
+    formatted_rows: List[Dict[str, Dict[str, Any]]],
+    raw_rows: List[Dict[str, Any]],
+    column_info: List[Tuple[str, bool, bool]],
+    normalized_values: Dict[str, str],
+    symbol_map: Dict[str, str],
+    id_map: Dict[int, str],
+) -> None:
+    """Set cell["link"] for cells whose raw value matched a fetched document."""
     if not symbol_map and not id_map:
         return
 
     for row_dict, raw_row in zip(formatted_rows, raw_rows):
-        for column, cell in row_dict.items():
-            raw_value = raw_row.get(column)
-            if raw_value is None:
+        for column, _, is_id_column in column_info:
+            raw_value = raw_row[column]
+            if raw_value is None or raw_value.__class__ is JSONText:
                 continue
-            column_lower = column.lower()
             link: Optional[str] = None
 
             if isinstance(raw_value, str):
-                normalized = normalize_symbol(raw_value)
+                normalized = normalized_values.get(raw_value)
+                if normalized is None:
+                    normalized = normalized_values[raw_value] = normalize_symbol(raw_value)
                 link = symbol_map.get(normalized)
-            elif isinstance(raw_value, int):
-                if column_lower in DOCUMENT_ID_COLUMN_HINTS or column_lower.endswith("document_id") or column_lower.endswith("_doc_id"):
-                    link = id_map.get(raw_value)
+            elif is_id_column and isinstance(raw_value, int):
+                link = id_map.get(raw_value)
 
             if link:
-                cell["link"] = link
+                row_dict[column]["link"] = link
+
+
+def annotate_document_links(formatted_rows: List[Dict[str, Dict[str, Any]]], raw_rows: List[Dict[str, Any]]) -> None:
+    """Attach PDF links to result cells when we can infer a document reference."""
+    if not formatted_rows:
+        return
+
+    column_info, symbol_refs, id_refs, normalized_values = collect_document_refs(raw_rows)
+    if not symbol_refs and not id_refs:
+        return
+    symbol_map, id_map = fetch_document_links(symbol_refs, id_refs)
+    apply_document_links(formatted_rows, raw_rows, column_info, normalized_values, symbol_map, id_map)
+
 
 def is_query_allowed(sql_query: str) -> Tuple[bool, str]:
     """Basic guardrail: restrict to read-only SQL statements."""
-    stripped = sql_query.strip().lower()
-    if not stripped:
+    if not sql_query or sql_query.isspace():
         return False, "Query is empty"
 
-    if not stripped.startswith(ALLOWED_PREFIXES):
+    if not ALLOWED_QUERY_PATTERN.match(sql_query):
         allowed = ", ".join(ALLOWED_PREFIXES)
         return False, f"Only read-only statements starting with {allowed} are allowed."
 
     return True, ""
 
 
-def execute_sql(sql_query: str, include_raw_rows: bool = False) -> Dict[str, Any]:
-    """Execute raw SQL and return structured results."""
+_JSON_OIDS = (114, 3802)  # json, jsonb
+_JSON_AS_TEXT = psycopg2.extensions.new_type(
+    _JSON_OIDS, "JSON_AS_TEXT", lambda value, cursor: None if value is None else JSONText(value)
+)
+
+
+if engine.dialect.driver == "psycopg2":
+    @event.listens_for(engine, "before_cursor_execute")
+    def _json_columns_as_text(conn, cursor, statement, parameters, context, executemany):
+        # Cursor-scoped, so ORM sessions on pooled connections still get dicts
+        if context is not None and context.execution_options.get("json_as_text"):
+            psycopg2.extensions.register_type(_JSON_AS_TEXT, cursor)
+
+
+# Recent query results, keyed by the SQL text, so sample queries and page reloads skip
+# the database. The data only changes on ETL runs; QUERY_CACHE_TTL=0 disables it.
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '60'))
+QUERY_CACHE_SIZE = 64
+# Results whose text/JSON cells add up to more than this many characters (e.g. full
+# doc_metadata or body text) aren't cached, so each worker holds at most SIZE * this
+QUERY_CACHE_ENTRY_CHARS = int(os.getenv('QUERY_CACHE_ENTRY_CHARS', '1000000'))
+_query_cache: "OrderedDict[str, Tuple[float, Tuple[Tuple[str, ...], Tuple[Any, ...], bool]]]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=256)
+def _compiled(sql_query: str):
+    """Reuse the TextClause for repeated queries so SQLAlchemy's statement cache hits."""
+    return text(sql_query)
+
+
+def _cell_chars(rows: List[Any]) -> int:
+    """Total length of the string cells in a result, as a proxy for its memory footprint."""
+    return sum(len(value) for row in rows for value in row if isinstance(value, (str, bytes)))
+
+
+def _fetch_rows(sql_query: str) -> Tuple[List[str], List[Any], bool]:
+    """
+    Run a query and return (columns, at most MAX_ROWS rows, truncated), cached for QUERY_CACHE_TTL.
+
+    Cached results are stored as tuples and handed out as fresh lists, so a caller
+    editing them can't change what later requests see.
+    """
+    key = sql_query.strip()
+    if QUERY_CACHE_TTL > 0:
+        now = time.monotonic()
+        with _query_cache_lock:
+            cached = _query_cache.get(key)
+            if cached is not None and cached[0] > now:
+                _query_cache.move_to_end(key)
+                columns, rows, truncated = cached[1]
+                return list(columns), list(rows), truncated
+
+    columns, rows, truncated = _fetch_rows_uncached(sql_query)
+
+    if QUERY_CACHE_TTL > 0 and _cell_chars(rows) <= QUERY_CACHE_ENTRY_CHARS:
+        entry = (tuple(columns), tuple(rows), truncated)
+        with _query_cache_lock:
+            _query_cache[key] = (time.monotonic() + QUERY_CACHE_TTL, entry)
+            _query_cache.move_to_end(key)
+            while len(_query_cache) > QUERY_CACHE_SIZE:
+                _query_cache.popitem(last=False)
+    return columns, rows, truncated
+
+
+def _query_body(sql_query: str) -> Optional[str]:
+    """
+    The query without a trailing semicolon, or None if it can't be used as a subquery.
+
+    Decided from the text alone, so a query is never sent twice: EXPLAIN, multiple
+    statements (any other ";") and data-modifying CTEs run as written, on a plain
+    (non-streaming) cursor.
+    """
+    body = sql_query.strip().rstrip(";").rstrip()
+    if not SUBQUERY_PREFIX_PATTERN.match(body) or ";" in body or NOT_SUBQUERY_PATTERN.search(body):
+        return None
+    return body
+
+
+def _limited_sql(sql_query: str) -> Optional[str]:
+    """
+    Wrap a SELECT/WITH query so Postgres itself stops after MAX_ROWS + 1 rows.
+
+    SQL doesn't promise that a subquery's ORDER BY survives the outer SELECT. Postgres
+    runs this bare "SELECT * ... LIMIT" as a subquery scan that emits rows in the inner
+    order, which the results page relies on.
+    """
+    body = _query_body(sql_query)
+    if body is None:
+        return None
+    # Newlines keep a trailing "-- comment" in the user's query from swallowing the ")"
+    return f"SELECT * FROM (\n{body}\n) AS _limited LIMIT {MAX_ROWS + 1}"
+
+
+def _fetch_rows_uncached(sql_query: str) -> Tuple[List[str], List[Any], bool]:
+    # Errors go straight to the caller: retrying unwrapped would only run a bad query twice
+    limited = _limited_sql(sql_query)
+    if limited is not None:
+        return _read_rows(limited, stream=True)
+    return _read_rows(sql_query, stream=False)
+
+
+def _read_rows(sql_query: str, stream: bool) -> Tuple[List[str], List[Any], bool]:
+    """
+    Run a query and keep at most MAX_ROWS rows, plus whether more were available.
+
+    stream uses a server-side cursor (psycopg2 DECLARE ... CURSOR), which Postgres only
+    allows for SELECT/VALUES, so it is reserved for the LIMIT-wrapped queries; anything
+    else (EXPLAIN, multiple statements, data-modifying CTEs) runs on a plain cursor.
+    """
+    # JSON columns arrive as text: no parse in the driver and re-serialize for display
+    options = {"json_as_text": True}
+    if stream:
+        # Only pull one row past MAX_ROWS to detect truncation
+        options.update(stream_results=True, yield_per=MAX_ROWS)
+    # Deliberately not AUTOCOMMIT: the streamed SELECTs need a transaction for their named
+    # cursor, and the plain-cursor path may carry a data-modifying CTE, which must be undone
+    # by the rollback when the connection goes back to the pool rather than committed
     with engine.connect() as connection:
-        result = connection.execute(text(sql_query))
+        result = connection.execution_options(**options).execute(_compiled(sql_query))
         columns = list(result.keys())
-        rows = result.fetchall()
-
-    formatted_rows = []
-    raw_rows = []
-    for row in rows[:MAX_ROWS]:
-        row_mapping = dict(row._mapping)
-        raw_rows.append(row_mapping)
-        row_dict = {}
-        for column in columns:
-            column_lower = column.lower()
-            formatted = format_value(row_mapping.get(column))
-
-            if column_lower in LONG_TEXT_COLUMNS:
-                formatted["long_column"] = True
-                raw_value = row_mapping.get(column)
-                if isinstance(raw_value, str) and len(raw_value) > LONG_TEXT_PREVIEW_CHARS:
-                    preview = raw_value[:LONG_TEXT_PREVIEW_CHARS].rstrip()
-                    formatted["display"] = f"{preview}…"
-                    formatted["long_text"] = raw_value
-
-            row_dict[column] = formatted
-        formatted_rows.append(row_dict)
-
-    annotate_document_links(formatted_rows, raw_rows)
+        rows = list(itertools.islice(result, MAX_ROWS + 1)) if stream else result.fetchmany(MAX_ROWS + 1)
 
     truncated = len(rows) > MAX_ROWS
-    result_payload = {
+    if truncated:
+        rows = rows[:MAX_ROWS]
+    return columns, rows, truncated
+
+
+def execute_sql_raw(sql_query: str) -> Dict[str, Any]:
+    """Execute raw SQL for JSON endpoints: full string values, no display formatting or links."""
+    columns, rows, truncated = _fetch_rows(sql_query)
+    json_rows = [
+        {column: render_value(value) for column, value in zip(columns, row)}
+        for row in rows
+    ]
+    return {
+        "columns": columns,
+        "row_count": len(json_rows),
+        "truncated": truncated,
+        "rows": json_rows,
+    }
+
+
+def execute_sql(sql_query: str) -> Dict[str, Any]:
+    """Execute raw SQL and return structured results."""
+    columns, rows, truncated = _fetch_rows(sql_query)
+
+    # Start the document-link lookup first: its DB round-trip overlaps the formatting below
+    raw_rows = [dict(zip(columns, row)) for row in rows]
+    column_info, symbol_refs, id_refs, normalized_values = collect_document_refs(raw_rows)
+    links_future = None
+    if symbol_refs or id_refs:
+        links_future = _document_link_executor.submit(fetch_document_links, symbol_refs, id_refs)
+
+    # Format column by column so each column picks its formatter once, not per cell
+    formatted_columns = []
+    for column, values in zip(columns, zip(*rows)):
+        if column.lower() in LONG_TEXT_COLUMNS:
+            formatter = format_long_text_value
+        else:
+            # Postgres columns are homogeneously typed, so one non-NULL value decides
+            sample = next((value for value in values if value is not None), None)
+            formatter = format_number if sample.__class__ in (int, float) else format_value
+        formatted_columns.append([formatter(value) for value in values])
+
+    formatted_rows = [dict(zip(columns, cells)) for cells in zip(*formatted_columns)]
+
+    if links_future is not None:
+        # Re-raises lookup errors (SQLAlchemyError) here, as the inline call did
+        symbol_map, id_map = links_future.result()
+        apply_document_links(formatted_rows, raw_rows, column_info, normalized_values, symbol_map, id_map)
+
+    # When truncated the total is unknown; row_count is a lower bound
+    return {
         "columns": columns,
         "rows": formatted_rows,
         "row_count": len(rows),
         "truncated": truncated,
     }
 
-    if include_raw_rows:
-        result_payload["raw_rows"] = raw_rows
 
-    return result_payload
+@functools.lru_cache(maxsize=1024)
+def _generate_sql_cached(natural_language_query: str) -> Optional[str]:
+    return generate_sql(natural_language_query)
+
+
+def cached_generate_sql(natural_language_query: str) -> Optional[str]:
+    """generate_sql memoized on the whitespace-normalized question; failures raise and are not cached."""
+    return _generate_sql_cached(" ".join(natural_language_query.split()))
+
+
+def _demo_mode(request: Request) -> bool:
+    demo = request.query_params.get("demo")
+    if demo is None:
+        return DEMO_MODE_DEFAULT
+    return demo.lower() == "true"
+
+
+def _render_index(
+    request: Request,
+    *,
+    demo_mode: bool,
+    sql_query: str = "",
+    result: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+    natural_language_query: str = "",
+    rag_answer: Optional[Dict[str, Any]] = None,
+    status_code: int = 200,
+    **extra: Any,
+) -> HTMLResponse:
+    """Render index.html with the context shared by every page view."""
+    context = {
+        "request": request,
+        "sql_query": sql_query,
+        "result": result,
+        "error": error,
+        "natural_language_query": natural_language_query,
+        "demo_mode": demo_mode,
+        "rag_answer": rag_answer,
+        **extra,
+    }
+    return templates.TemplateResponse("index.html", context, status_code=status_code)
 
 
 @app.get("/healthz")
-def healthcheck() -> Dict[str, str]:
-    return {"status": "ok"}
+async def healthcheck() -> Dict[str, str]:
+    return {"status": "ok", "db_pool": engine.pool.status()}
 
 
 @app.get("/login", response_class=HTMLResponse)
-def login_page(request: Request, next: str = "/"):
+async def login_page(request: Request, next: str = "/"):
     target = _safe_next_url(next)
     if not ENABLE_AUTH or is_authenticated(request):
         return RedirectResponse(target, status_code=status.HTTP_303_SEE_OTHER)
@@ -416,7 +847,7 @@ def login_page(request: Request, next: str = "/"):
 
 
 @app.post("/login", response_class=HTMLResponse)
-def login_submit(request: Request, password: str = Form(...), next: str = Form("/")):
+async def login_submit(request: Request, password: str = Form(...), next: str = Form("/")):
     target = _safe_next_url(next)
     if not ENABLE_AUTH:
         return RedirectResponse(target, status_code=status.HTTP_303_SEE_OTHER)
@@ -457,40 +888,51 @@ def _logout_response(next_value: str) -> RedirectResponse:
 
 
 @app.post("/logout")
-def logout_post(next: str = Form("/")):
+async def logout_post(next: str = Form("/")):
     return _logout_response(next)
 
 
 @app.get("/logout")
-def logout_get(next: str = "/"):
+async def logout_get(next: str = "/"):
     return _logout_response(next)
 
 
+def _index_etag(demo_mode: bool, think_more_enabled: str) -> str:
+    """ETag for GET /: covers the template file and everything the empty page renders."""
+    template_mtime = (APP_DIR / "templates" / "index.html").stat().st_mtime_ns
+    payload = repr((
+        SAMPLE_QUERIES, DEMO_QUESTIONS, demo_mode, think_more_enabled, template_mtime,
+        static_url("styles.css"),
+    ))
+    return '"%s"' % hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
 @app.get("/", response_class=HTMLResponse, dependencies=[Depends(require_auth)])
-def home(request: Request):
-    demo_mode = request.query_params.get("demo", str(DEMO_MODE_DEFAULT).lower()).lower() == "true"
+async def home(request: Request):
+    demo_mode = _demo_mode(request)
     think_more_enabled = os.environ.get("THINK_MORE_ENABLED", "true")
-    print(f"{think_more_enabled=}")
-    return templates.TemplateResponse(
-        "index.html",
-        {
-            "request": request,
-            "sql_query": SAMPLE_QUERIES[0],
-            "result": None,
-            "error": None,
-            "samples": SAMPLE_QUERIES,
-            "natural_language_query": "",
-            "demo_mode": demo_mode,
-            "think_more_enabled": think_more_enabled,
-            "demo_questions": DEMO_QUESTIONS,
-            "rag_answer": None,
-        },
+    logger.debug(f"THINK_MORE_ENABLED={think_more_enabled}")
+
+    # The empty page only changes on deploy, so revisits get a 304 without rendering
+    etag = _index_etag(demo_mode, think_more_enabled)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    response = _render_index(
+        request,
+        demo_mode=demo_mode,
+        sql_query=SAMPLE_QUERIES[0],
+        think_more_enabled=think_more_enabled,
     )
+    response.headers.update(cache_headers)
+    return response
 
 
 @app.post("/", response_class=HTMLResponse, dependencies=[Depends(require_auth)])
 def run_query(request: Request, sql_query: str = Form(...)):
-    demo_mode = request.query_params.get("demo", str(DEMO_MODE_DEFAULT).lower()).lower() == "true"
+    demo_mode = _demo_mode(request)
     sql_query = sql_query.strip()
     logger.info(f"Direct SQL query: {sql_query}")
     
@@ -498,17 +940,11 @@ def run_query(request: Request, sql_query: str = Form(...)):
 
     if not allowed:
         logger.warning(f"Query not allowed: {message}")
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "sql_query": sql_query,
-                "result": None,
-                "error": message,
-                "samples": SAMPLE_QUERIES,
-                "natural_language_query": "",
-                "demo_mode": demo_mode,
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            sql_query=sql_query,
+            error=message,
             status_code=400,
         )
 
@@ -516,31 +952,19 @@ def run_query(request: Request, sql_query: str = Form(...)):
         result = execute_sql(sql_query)
         logger.info(f"SQL executed successfully - Rows returned: {result['row_count']}, Truncated: {result['truncated']}")
         
-        context = {
-            "request": request,
-            "sql_query": sql_query,
-            "result": result,
-            "error": None,
-            "samples": SAMPLE_QUERIES,
-            "natural_language_query": "",
-            "demo_mode": demo_mode,
-        }
-        return templates.TemplateResponse("index.html", context)
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            sql_query=sql_query,
+            result=result,
+        )
     except SQLAlchemyError as exc:
         logger.error(f"SQL execution failed: {str(exc)}")
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "sql_query": sql_query,
-                "result": None,
-                "error": str(exc),
-                "samples": SAMPLE_QUERIES,
-                "natural_language_query": "",
-                "demo_mode": demo_mode,
-                "demo_questions": DEMO_QUESTIONS,
-                "rag_answer": None,
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            sql_query=sql_query,
+            error=str(exc),
             status_code=400,
         )
 
@@ -557,39 +981,26 @@ def download_results(sql_query: str = Form(...)):
         raise HTTPException(status_code=400, detail=message)
 
     try:
-        result = execute_sql(query, include_raw_rows=True)
+        # CSV only needs the raw values: skip cell formatting and the PDF-link lookup
+        columns, rows, _ = _fetch_rows(query)
     except SQLAlchemyError as exc:
         logger.error(f"CSV download failed: {str(exc)}")
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    columns = result.get("columns") or []
-    raw_rows = result.get("raw_rows") or []
     if not columns:
         raise HTTPException(status_code=400, detail="Query returned no columns")
 
-    def csv_rows():
-        buffer = StringIO()
-        writer = csv.writer(buffer)
-        writer.writerow(columns)
-        yield buffer.getvalue()
-        buffer.seek(0)
-        buffer.truncate(0)
-
-        for row in raw_rows:
-            values = []
-            for column in columns:
-                value = row.get(column)
-                values.append("" if value is None else value)
-            writer.writerow(values)
-            yield buffer.getvalue()
-            buffer.seek(0)
-            buffer.truncate(0)
+    # At most MAX_ROWS rows, so write the file in one pass (csv writes None as "")
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    writer.writerows(rows)
 
     timestamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
     filename = f"query-results-{timestamp}.csv"
     headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    logger.info(f"Download CSV requested - Rows returned: {len(raw_rows)}")
-    return StreamingResponse(csv_rows(), media_type="text/csv", headers=headers)
+    logger.info(f"Download CSV requested - Rows returned: {len(rows)}")
+    return Response(buffer.getvalue(), media_type="text/csv", headers=headers)
 
 
 @app.post("/rag-answer", response_class=HTMLResponse, dependencies=[Depends(require_auth)])
@@ -600,7 +1011,7 @@ def rag_answer_query(
     result_json: str = Form(None)
 ):
     """Answer a question using RAG with evidence grounding (HTML response)."""
-    demo_mode = request.query_params.get("demo", str(DEMO_MODE_DEFAULT).lower()).lower() == "true"
+    demo_mode = _demo_mode(request)
     
     try:
         result = None
@@ -611,7 +1022,7 @@ def rag_answer_query(
         if natural_language_query and not sql_query and not result_json:
             try:
                 logger.info(f"Using Orchestrator (Fast Mode) for: {natural_language_query}")
-                orch = MultiStepOrchestrator()
+                orch = get_orchestrator(request)
                 # Use fast mode to replicate "regular" pipeline
                 rag_answer = orch.answer_multistep(natural_language_query, mode="fast")
                 
@@ -626,19 +1037,11 @@ def rag_answer_query(
             except Exception as exc:
                 logger.error(f"Orchestrator fast mode failed: {str(exc)}", exc_info=True)
                 # Fall through to legacy method or show error
-                return templates.TemplateResponse(
-                    "index.html",
-                    {
-                        "request": request,
-                        "sql_query": "",
-                        "result": None,
-                        "error": f"Analysis failed: {str(exc)}",
-                        "samples": SAMPLE_QUERIES,
-                        "natural_language_query": natural_language_query,
-                        "demo_mode": demo_mode,
-                        "demo_questions": DEMO_QUESTIONS,
-                        "rag_answer": None,
-                    },
+                return _render_index(
+                    request,
+                    demo_mode=demo_mode,
+                    error=f"Analysis failed: {str(exc)}",
+                    natural_language_query=natural_language_query,
                     status_code=500,
                 )
 
@@ -647,25 +1050,18 @@ def rag_answer_query(
             # If natural language query provided, generate and execute SQL
             if natural_language_query and not result:
                 if not sql_query:
-                    final_sql_query = generate_sql(natural_language_query)
+                    final_sql_query = cached_generate_sql(natural_language_query)
                     logger.info(f"Generated SQL: {final_sql_query}")
                 
                 if final_sql_query:
                     allowed, message = is_query_allowed(final_sql_query)
                     if not allowed:
-                        return templates.TemplateResponse(
-                            "index.html",
-                            {
-                                "request": request,
-                                "sql_query": final_sql_query,
-                                "result": None,
-                                "error": f"Query not allowed: {message}",
-                                "samples": SAMPLE_QUERIES,
-                                "natural_language_query": natural_language_query,
-                                "demo_mode": demo_mode,
-                                "demo_questions": DEMO_QUESTIONS,
-                                "rag_answer": None,
-                            },
+                        return _render_index(
+                            request,
+                            demo_mode=demo_mode,
+                            sql_query=final_sql_query,
+                            error=f"Query not allowed: {message}",
+                            natural_language_query=natural_language_query,
                             status_code=400,
                         )
                     
@@ -673,22 +1069,15 @@ def rag_answer_query(
                     logger.info(f"SQL executed - Rows: {result['row_count']}")
             
             elif result_json:
-                result = json.loads(result_json)
+                result = json_loads(result_json)
             
             if not result:
-                return templates.TemplateResponse(
-                    "index.html",
-                    {
-                        "request": request,
-                        "sql_query": sql_query or "",
-                        "result": None,
-                        "error": "Either natural_language_query or result_json must be provided",
-                        "samples": SAMPLE_QUERIES,
-                        "natural_language_query": natural_language_query or "",
-                        "demo_mode": demo_mode,
-                        "demo_questions": DEMO_QUESTIONS,
-                        "rag_answer": None,
-                    },
+                return _render_index(
+                    request,
+                    demo_mode=demo_mode,
+                    sql_query=sql_query or "",
+                    error="Either natural_language_query or result_json must be provided",
+                    natural_language_query=natural_language_query or "",
                     status_code=400,
                 )
             
@@ -702,53 +1091,33 @@ def rag_answer_query(
                 prompt_style=RAG_PROMPT_STYLE
             )
         
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "sql_query": final_sql_query or sql_query or "",
-                "result": result,
-                "error": None,
-                "samples": SAMPLE_QUERIES,
-                "natural_language_query": natural_language_query or "",
-                "demo_mode": demo_mode,
-                "demo_questions": DEMO_QUESTIONS,
-                "rag_answer": rag_answer,
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            sql_query=final_sql_query or sql_query or "",
+            result=result,
+            natural_language_query=natural_language_query or "",
+            rag_answer=rag_answer,
         )
     
     except json.JSONDecodeError as exc:
         logger.error(f"Invalid JSON: {str(exc)}")
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "sql_query": sql_query or "",
-                "result": None,
-                "error": f"Invalid JSON: {str(exc)}",
-                "samples": SAMPLE_QUERIES,
-                "natural_language_query": natural_language_query or "",
-                "demo_mode": demo_mode,
-                "demo_questions": DEMO_QUESTIONS,
-                "rag_answer": None,
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            sql_query=sql_query or "",
+            error=f"Invalid JSON: {str(exc)}",
+            natural_language_query=natural_language_query or "",
             status_code=400,
         )
     except Exception as exc:
         logger.error(f"RAG Q&A failed: {str(exc)}", exc_info=True)
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "sql_query": sql_query or "",
-                "result": None,
-                "error": f"Failed to answer question: {str(exc)}",
-                "samples": SAMPLE_QUERIES,
-                "natural_language_query": natural_language_query or "",
-                "demo_mode": demo_mode,
-                "demo_questions": DEMO_QUESTIONS,
-                "rag_answer": None,
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            sql_query=sql_query or "",
+            error=f"Failed to answer question: {str(exc)}",
+            natural_language_query=natural_language_query or "",
             status_code=500,
         )
 
@@ -765,20 +1134,9 @@ def api_query(sql_query: str = Form(...)):
         return JSONResponse({"error": message}, status_code=400)
 
     try:
-        result = execute_sql(sql_query)
+        result = execute_sql_raw(sql_query)
         logger.info(f"SQL executed successfully - Rows returned: {result['row_count']}, Truncated: {result['truncated']}")
-        
-        # Convert values back to strings for JSON response
-        json_rows = []
-        for row in result["rows"]:
-            json_rows.append({col: cell["full"] for col, cell in row.items()})
-
-        return {
-            "columns": result["columns"],
-            "row_count": result["row_count"],
-            "truncated": result["truncated"],
-            "rows": json_rows,
-        }
+        return result
     except SQLAlchemyError as exc:
         logger.error(f"SQL execution failed: {str(exc)}")
         return JSONResponse({"error": str(exc)}, status_code=400)
@@ -794,7 +1152,7 @@ def api_text_to_sql(natural_language_query: str = Form(None), execute: bool = Fo
     logger.info(f"Text-to-SQL API request - Natural language: {natural_language_query}")
     
     try:
-        sql_query = generate_sql(natural_language_query)
+        sql_query = cached_generate_sql(natural_language_query)
         logger.info(f"Generated SQL: {sql_query}")
         
         if execute:
@@ -808,20 +1166,13 @@ def api_text_to_sql(natural_language_query: str = Form(None), execute: bool = Fo
                 }, status_code=400)
             
             try:
-                result = execute_sql(sql_query)
+                result = execute_sql_raw(sql_query)
                 logger.info(f"SQL executed successfully - Rows returned: {result['row_count']}, Truncated: {result['truncated']}")
                 
-                json_rows = []
-                for row in result["rows"]:
-                    json_rows.append({col: cell["full"] for col, cell in row.items()})
-                
                 return {
                     "sql": sql_query,
                     "natural_language_query": natural_language_query,
-                    "columns": result["columns"],
-                    "row_count": result["row_count"],
-                    "truncated": result["truncated"],
-                    "rows": json_rows,
+                    **result,
                 }
             except SQLAlchemyError as exc:
                 logger.error(f"SQL execution failed: {str(exc)}")
@@ -844,21 +1195,12 @@ def api_text_to_sql(natural_language_query: str = Form(None), execute: bool = Fo
 @app.post("/text-to-sql", response_class=HTMLResponse, dependencies=[Depends(require_auth)])
 def text_to_sql_query(request: Request, natural_language_query: str = Form(None), execute: bool = Form(False)):
     """Convert natural language to SQL and optionally execute it."""
-    demo_mode = request.query_params.get("demo", str(DEMO_MODE_DEFAULT).lower()).lower() == "true"
+    demo_mode = _demo_mode(request)
     if not natural_language_query:
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "sql_query": "",
-                "result": None,
-                "error": "natural_language_query field is required",
-                "samples": SAMPLE_QUERIES,
-                "natural_language_query": "",
-                "demo_mode": demo_mode,
-                "demo_questions": DEMO_QUESTIONS,
-                "rag_answer": None,
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            error="natural_language_query field is required",
             status_code=400,
         )
     
@@ -866,25 +1208,18 @@ def text_to_sql_query(request: Request, natural_language_query: str = Form(None)
     logger.info(f"Text-to-SQL UI request - Natural language: {natural_language_query}")
     
     try:
-        sql_query = generate_sql(natural_language_query)
+        sql_query = cached_generate_sql(natural_language_query)
         logger.info(f"Generated SQL: {sql_query}")
         
         if execute:
             allowed, message = is_query_allowed(sql_query)
             if not allowed:
-                return templates.TemplateResponse(
-                    "index.html",
-                    {
-                        "request": request,
-                        "sql_query": sql_query,
-                        "result": None,
-                        "error": f"Generated query not allowed: {message}",
-                        "samples": SAMPLE_QUERIES,
-                        "natural_language_query": natural_language_query,
-                        "demo_mode": demo_mode,
-                        "demo_questions": DEMO_QUESTIONS,
-                        "rag_answer": None,
-                    },
+                return _render_index(
+                    request,
+                    demo_mode=demo_mode,
+                    sql_query=sql_query,
+                    error=f"Generated query not allowed: {message}",
+                    natural_language_query=natural_language_query,
                     status_code=400,
                 )
             
@@ -907,78 +1242,84 @@ def text_to_sql_query(request: Request, natural_language_query: str = Form(None)
                         logger.warning(f"RAG Q&A failed in demo mode: {str(rag_exc)}")
                         # Continue without RAG answer
                 
-                return templates.TemplateResponse(
-                    "index.html",
-                    {
-                        "request": request,
-                        "sql_query": sql_query,
-                        "result": result,
-                        "error": None,
-                        "samples": SAMPLE_QUERIES,
-                        "natural_language_query": natural_language_query,
-                        "demo_mode": demo_mode,
-                        "demo_questions": DEMO_QUESTIONS,
-                        "rag_answer": rag_answer,
-                    },
+                return _render_index(
+                    request,
+                    demo_mode=demo_mode,
+                    sql_query=sql_query,
+                    result=result,
+                    natural_language_query=natural_language_query,
+                    rag_answer=rag_answer,
                 )
             except SQLAlchemyError as exc:
                 logger.error(f"SQL execution failed: {str(exc)}")
-                return templates.TemplateResponse(
-                    "index.html",
-                    {
-                        "request": request,
-                        "sql_query": sql_query,
-                        "result": None,
-                        "error": f"SQL execution failed: {str(exc)}",
-                        "samples": SAMPLE_QUERIES,
-                        "natural_language_query": natural_language_query,
-                        "demo_mode": demo_mode,
-                        "demo_questions": DEMO_QUESTIONS,
-                        "rag_answer": None,
-                    },
+                return _render_index(
+                    request,
+                    demo_mode=demo_mode,
+                    sql_query=sql_query,
+                    error=f"SQL execution failed: {str(exc)}",
+                    natural_language_query=natural_language_query,
                     status_code=400,
                 )
         else:
             # Just show the generated SQL
             logger.info("SQL generated but not executed")
-            return templates.TemplateResponse(
-                "index.html",
-                {
-                    "request": request,
-                    "sql_query": sql_query,
-                    "result": None,
-                    "error": None,
-                    "samples": SAMPLE_QUERIES,
-                    "natural_language_query": natural_language_query,
-                    "demo_mode": demo_mode,
-                    "demo_questions": DEMO_QUESTIONS,
-                    "rag_answer": None,
-                },
+            return _render_index(
+                request,
+                demo_mode=demo_mode,
+                sql_query=sql_query,
+                natural_language_query=natural_language_query,
             )
     except Exception as exc:
         logger.error(f"Text-to-SQL generation failed: {str(exc)}", exc_info=True)
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "sql_query": "",
-                "result": None,
-                "error": f"Failed to generate SQL: {str(exc)}",
-                "samples": SAMPLE_QUERIES,
-                "natural_language_query": natural_language_query,
-                "demo_mode": demo_mode,
-                "demo_questions": DEMO_QUESTIONS,
-                "rag_answer": None,
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            error=f"Failed to generate SQL: {str(exc)}",
+            natural_language_query=natural_language_query,
             status_code=500,
         )
 
 
+# Background summaries started with /api/summarize?background=true, newest last. In-memory and
+# per worker process, so polling must reach the same worker (single-worker deploys, sticky sessions).
+SUMMARY_JOBS_MAX = 256
+_summary_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_summary_jobs_lock = threading.Lock()
+
+
+def _set_summary_job(job_id: str, state: Dict[str, Any]) -> None:
+    with _summary_jobs_lock:
+        _summary_jobs[job_id] = state
+        while len(_summary_jobs) > SUMMARY_JOBS_MAX:
+            _summary_jobs.popitem(last=False)
+
+
+def _run_summary_job(job_id: str, result: Dict[str, Any], original_question: str) -> None:
+    try:
+        summary = summarize_results(result, original_question)
+    except Exception as exc:
+        logger.error(f"Background summarization failed: {str(exc)}", exc_info=True)
+        state = {"status": "error", "error": str(exc)}
+    else:
+        state = {
+            "status": "done",
+            "summary": summary,
+            "original_question": original_question,
+            "row_count": result.get("row_count", 0),
+        }
+    with _summary_jobs_lock:
+        # Skip jobs already evicted by newer ones
+        if job_id in _summary_jobs:
+            _summary_jobs[job_id] = state
+
+
 @app.post("/api/summarize", dependencies=[Depends(require_auth)])
 def api_summarize(
+    background_tasks: BackgroundTasks,
     sql_query: str = Form(None),
     natural_language_query: str = Form(None),
-    result_json: str = Form(None)
+    result_json: str = Form(None),
+    background: bool = Form(False),
 ):
     """
     Summarize SQL query results using RAG.
@@ -986,6 +1327,8 @@ def api_summarize(
     Requires:
     - Either sql_query (for direct SQL) or natural_language_query (for text-to-SQL)
     - result_json: JSON string of the query results from execute_sql
+
+    With background=true, returns {"job_id": ...} right away; poll /api/summarize/{job_id}.
     """
     logger.info(f"Summarization API request - SQL: {sql_query}, NL: {natural_language_query}")
     
@@ -997,7 +1340,13 @@ def api_summarize(
     
     try:
         # Parse the result JSON
-        result = json.loads(result_json)
+        result = json_loads(result_json)
+
+        if background:
+            job_id = uuid.uuid4().hex
+            _set_summary_job(job_id, {"status": "pending"})
+            background_tasks.add_task(_run_summary_job, job_id, result, original_question)
+            return JSONResponse({"job_id": job_id, "status": "pending"}, status_code=202)
         
         # Summarize the results
         summary = summarize_results(result, original_question)
@@ -1015,8 +1364,57 @@ def api_summarize(
         return JSONResponse({"error": str(exc)}, status_code=500)
 
 
+@app.get("/api/summarize/{job_id}", dependencies=[Depends(require_auth)])
+async def api_summarize_job(job_id: str):
+    """State of a background summary: pending, done (with summary) or error."""
+    with _summary_jobs_lock:
+        state = _summary_jobs.get(job_id)
+    if state is None:
+        return JSONResponse({"error": "Unknown or expired job_id"}, status_code=404)
+    return {"job_id": job_id, **state}
+
+
+@app.post("/api/query-and-summarize", dependencies=[Depends(require_auth)])
+def api_query_and_summarize(sql_query: str = Form(...), natural_language_query: str = Form(None)):
+    """
+    Execute SQL and summarize the results in one request.
+
+    Same output as /api/query plus a "summary" field; clients that only want the summary
+    skip sending the rows back to /api/summarize as result_json.
+    """
+    sql_query = sql_query.strip()
+    logger.info(f"Query+summarize API request - SQL: {sql_query}, NL: {natural_language_query}")
+
+    allowed, message = is_query_allowed(sql_query)
+    if not allowed:
+        logger.warning(f"Query not allowed: {message}")
+        return JSONResponse({"error": message}, status_code=400)
+
+    original_question = natural_language_query or "Summarize these results"
+    try:
+        result = execute_sql_raw(sql_query)
+        logger.info(f"SQL executed successfully - Rows returned: {result['row_count']}, Truncated: {result['truncated']}")
+    except SQLAlchemyError as exc:
+        logger.error(f"SQL execution failed: {str(exc)}")
+        return JSONResponse({"error": str(exc)}, status_code=400)
+
+    try:
+        summary = summarize_results(result, original_question)
+    except Exception as exc:
+        logger.error(f"Summarization failed: {str(exc)}", exc_info=True)
+        return JSONResponse({"error": str(exc)}, status_code=500)
+
+    return {
+        "sql": sql_query,
+        **result,
+        "summary": summary,
+        "original_question": original_question,
+    }
+
+
 @app.post("/api/rag-answer", dependencies=[Depends(require_auth)])
 def api_rag_answer(
+    request: Request,
     natural_language_query: str = Form(None),
     sql_query: str = Form(None),
     result_json: str = Form(None),
@@ -1061,7 +1459,7 @@ def api_rag_answer(
                 logger.info(f"Created new conversation {conv.conversation_id}")
 
             try:
-                orch = MultiStepOrchestrator()
+                orch = get_orchestrator(request)
                 result_dict = orch.answer_multistep(
                     natural_language_query,
                     mode="fast",
@@ -1128,7 +1526,7 @@ def api_rag_answer(
         if natural_language_query:
             if not sql_query:
                 # Generate SQL from natural language
-                final_sql_query = generate_sql(natural_language_query)
+                final_sql_query = cached_generate_sql(natural_language_query)
                 logger.info(f"Generated SQL: {final_sql_query}")
             
             # Execute SQL if we have a query
@@ -1146,7 +1544,7 @@ def api_rag_answer(
         
         # If result_json provided, parse it
         elif result_json:
-            result = json.loads(result_json)
+            result = json_loads(result_json)
         
         if not result:
             return JSONResponse({
@@ -1185,13 +1583,12 @@ def api_rag_answer(
 
 @app.post("/api/multistep-answer", dependencies=[Depends(require_auth)])
 def api_multistep_answer(
+    request: Request,
     natural_language_query: str = Form(...),
     mode: str = Form("fast"),
     conversation_id: Optional[str] = Form(None)
 ):
     """Multi-step RAG with automatic tool selection and conversation support."""
-    from rag.multistep.orchestrator import MultiStepOrchestrator
-
     logger.info(f"Multi-step query: {natural_language_query}, mode: {mode}, conversation_id: {conversation_id}")
 
     try:
@@ -1239,7 +1636,7 @@ def api_multistep_answer(
         logger.info(f"  simple_turns={'provided' if simple_turns else 'None'}")
         logger.info(f"  conversation_history={'provided' if conversation_history else 'None'}")
 
-        orchestrator = MultiStepOrchestrator()
+        orchestrator = get_orchestrator(request)
         result = orchestrator.answer_multistep(
             natural_language_query,
             mode=mode,
@@ -1307,42 +1704,24 @@ def api_multistep_answer(
 @app.post("/multistep-answer", response_class=HTMLResponse, dependencies=[Depends(require_auth)])
 def multistep_answer_html(request: Request, natural_language_query: str = Form(...), mode: str = Form("fast")):
     """HTML version of multi-step RAG."""
-    from rag.multistep.orchestrator import MultiStepOrchestrator
-
-    demo_mode = request.query_params.get("demo", str(DEMO_MODE_DEFAULT).lower()).lower() == "true"
+    demo_mode = _demo_mode(request)
 
     try:
-        orchestrator = MultiStepOrchestrator()
+        orchestrator = get_orchestrator(request)
         result = orchestrator.answer_multistep(natural_language_query, mode=mode)
 
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "natural_language_query": natural_language_query,
-                "rag_answer": result,
-                "demo_mode": demo_mode,
-                "demo_questions": DEMO_QUESTIONS,
-                "samples": SAMPLE_QUERIES,
-                "sql_query": "", # Multi-step doesn't have a single SQL query
-                "result": None,
-                "error": None
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            natural_language_query=natural_language_query,
+            rag_answer=result,
         )
     except Exception as exc:
         logger.error(f"Multi-step query failed: {str(exc)}", exc_info=True)
-        return templates.TemplateResponse(
-            "index.html",
-            {
-                "request": request,
-                "error": f"Multi-step query failed: {str(exc)}",
-                "natural_language_query": natural_language_query,
-                "demo_mode": demo_mode,
-                "samples": SAMPLE_QUERIES,
-                "demo_questions": DEMO_QUESTIONS,
-                "rag_answer": None,
-                "sql_query": "",
-                "result": None,
-            },
+        return _render_index(
+            request,
+            demo_mode=demo_mode,
+            error=f"Multi-step query failed: {str(exc)}",
+            natural_language_query=natural_language_query,
             status_code=500,
         )
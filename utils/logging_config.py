@@ -6,7 +6,10 @@ Usage:
     logger = get_logger(__name__)
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 from pathlib import Path
 from typing import Optional
 
@@ -14,7 +17,8 @@ from typing import Optional
 def get_logger(
     name: str,
     log_file: Optional[str] = None,
-    level: int = logging.INFO
+    level: int = logging.INFO,
+    use_queue: bool = False
 ) -> logging.Logger:
     """
     Get a configured logger instance.
@@ -23,6 +27,8 @@ def get_logger(
         name: Logger name (typically __name__ from calling module)
         log_file: Optional specific log file name (defaults to module-based name)
         level: Logging level (default: INFO)
+        use_queue: Hand records to a background thread that does the file/console
+            writes, so callers (e.g. request handlers) never block on log I/O
 
     Returns:
         Configured logger with file and console handlers
@@ -50,7 +56,6 @@ def get_logger(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
 
         # Console handler
         console_handler = logging.StreamHandler()
@@ -59,7 +64,19 @@ def get_logger(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
+
+        if use_queue:
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(
+                log_queue, file_handler, console_handler, respect_handler_level=True
+            )
+            listener.start()
+            # Flush whatever is still queued on interpreter shutdown
+            atexit.register(listener.stop)
+            logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        else:
+            logger.addHandler(file_handler)
+            logger.addHandler(console_handler)
 
     # Prevent propagation to root logger (avoid duplicate messages)
     logger.propagate = False